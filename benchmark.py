@@ -0,0 +1,396 @@
+"""Offline benchmark for installing, updating and verifying the client.
+
+A synthetic bucket with the same layout as BUCKET_URL (last_version.json,
+EPTAClient/eptaclientbase.zip, mods/mods.json, per-version deltas and
+manifests) is generated in a temporary directory and served from a local
+HTTP server that supports ranges and can add latency and cap bandwidth.
+launcher_core is pointed at it and each scenario is timed in a fresh game and
+config directory:
+
+    python benchmark.py --mods 200 --latency-ms 30 --bandwidth-mbps 100 -o results.json
+    python benchmark.py --compare old.json new.json
+
+Results are written as JSON so runs from different commits can be compared.
+"""
+import argparse
+import functools
+import hashlib
+import http.server
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import launcher_core as launcher
+
+
+SCENARIOS = ("full", "partial", "check", "verify")
+
+
+class Throttle:
+    """Token bucket shared by all connections of the bucket server."""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, n: int):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class BucketHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler with Range/If-Range, ETag/If-None-Match, latency and throttling."""
+
+    latency = 0.0
+    throttle = Throttle(0)
+    stats = {"requests": 0, "bytes": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body: bool):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.translate_path(self.path.split("?", 1)[0])
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        st = os.stat(path)
+        size = st.st_size
+        etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            with self.stats_lock:
+                self.stats["requests"] += 1
+            return
+        start, end, status = 0, size - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (not if_range or if_range == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        with self.stats_lock:
+            self.stats["requests"] += 1
+        if not body:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            left = end - start + 1
+            while left:
+                data = f.read(min(64 * 1024, left))
+                self.throttle.take(len(data))
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                left -= len(data)
+                with self.stats_lock:
+                    self.stats["bytes"] += len(data)
+
+
+def serve_bucket(root: str, latency_ms: float = 0, bandwidth_mbps: float = 0, handler=None):
+    """Serve root on a free localhost port. Return the running server.
+
+    Servers started with the handler of another one act as its mirrors:
+    they share its statistics and bandwidth cap.
+    """
+    handler = handler or type("Handler", (BucketHandler,), {
+        "latency": latency_ms / 1000,
+        "throttle": Throttle(bandwidth_mbps * 1000 * 1000 / 8),
+        "stats": {"requests": 0, "bytes": 0},
+    })
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=root))
+    server.daemon_threads = True
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _write(root: str, rel: str, data) -> dict:
+    """Write data under root and return its manifest entry."""
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not isinstance(data, bytes):
+        data = json.dumps(data).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    return {"path": rel, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def _blob(rng: random.Random, size: int) -> bytes:
+    """Return size bytes that deflate to roughly half, like a typical jar."""
+    half = rng.randbytes(size // 2)
+    return half + bytes(size - len(half))
+
+
+def build_bucket(root: str, args) -> dict:
+    """Generate versions v1 and v2 of a client under root. Return sizes."""
+    rng = random.Random(args.seed)
+    versions = {"v1": [], "v2": []}
+
+    # Base archive: the Forge jar plus libraries, mirrored next to it for repair
+    base_entries = []
+    zip_path = os.path.join(root, "EPTAClient", "eptaclientbase.zip")
+    os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        names = ["versions/Forge-1.20.1/Forge-1.20.1.jar"]
+        names += [f"libraries/lib{i}/lib{i}.jar" for i in range(args.base_files - 1)]
+        per_file = max(1, args.base_size_mb * 1024 * 1024 // len(names))
+        for name in names:
+            data = _blob(rng, per_file)
+            zf.writestr(name, data)
+            base_entries.append(_write(root, f"EPTAClient/{name}", data))
+            base_entries[-1]["path"] = name
+    for version in versions:
+        versions[version] += base_entries
+
+    def mod_size():
+        return max(1, int(rng.expovariate(1 / (args.mod_size_kb * 1024))))
+
+    mods = {f"mod{i}.jar": _blob(rng, mod_size()) for i in range(args.mods)}
+    configs = {f"cfg{i}.toml": f"# config {i}\nvalue = {i}\n".encode() * 20 for i in range(args.configs)}
+    changed = sorted(mods)[:max(1, args.mods * args.changed_percent // 100)] if args.mods else []
+
+    # v1 is what mods/mods.json installs on a fresh client
+    _write(root, "mods/mods.json", {"add": sorted(mods)})
+    _write(root, "config/configs.json", {"add": sorted(configs)})
+    _write(root, "kubejs/kubejs.json", {"add": ["startup_scripts/main.js"]})
+    for name, data in mods.items():
+        versions["v1"].append(_write(root, f"mods/{name}", data))
+    for name, data in configs.items():
+        entry = _write(root, f"config/{name}", data)
+        entry["mutable"] = True
+        versions["v1"].append(entry)
+    versions["v1"].append(_write(root, "kubejs/startup_scripts/main.js", b"// startup\n"))
+
+    # v2 replaces a share of the mods with new builds
+    new_names = {name: name.replace(".jar", "-v2.jar") for name in changed}
+    for entry in versions["v1"]:
+        name = entry["path"].split("/", 1)[1]
+        if entry["path"].startswith("mods/") and name in new_names:
+            data = _blob(rng, len(mods[name]))
+            versions["v2"].append(_write(root, f"mods/{new_names[name]}", data))
+        elif not entry["path"].startswith(("versions/", "libraries/")):
+            versions["v2"].append(entry)
+    _write(root, "v2/mods/v1.json", {"del": changed, "add": sorted(new_names.values())})
+    _write(root, "v2/configs/v1.json", {"del": [], "add": []})
+    _write(root, "v2/kubejs/v1.json", {"del": [], "add": []})
+    for version, files in versions.items():
+        _write(root, f"{version}/manifest.json", {"files": files})
+    _write(root, "last_version.json", {"last": "v1", "unsupported": []})
+    return {
+        "base_bytes": os.path.getsize(zip_path),
+        "mod_bytes": sum(len(d) for d in mods.values()),
+        "changed_mods": len(changed),
+    }
+
+
+def _closed_url() -> str:
+    """Return a localhost URL nothing listens on, standing in for a mirror that is down."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def _point_launcher(bucket_urls: list[str], work: str):
+    """Aim launcher_core at the local bucket and a throwaway game/config dir."""
+    game_dir = os.path.join(work, "game")
+    config_dir = os.path.join(work, "config")
+    os.makedirs(config_dir, exist_ok=True)
+    launcher.BUCKET_URL = bucket_urls[0]
+    launcher.BUCKET_MIRRORS = bucket_urls[1:]
+    launcher.GAME_DIR = game_dir
+    launcher.CONFIG_DIR = config_dir
+    launcher.CONFIG_FILE = os.path.join(config_dir, "config.json")
+    launcher.LAST_VERSION = None
+    launcher.reset_http_session()
+    launcher.mirrors = launcher.MirrorSet()
+    launcher.mirrors.probe()
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def run_scenario(name: str, bucket_root: str, server, work: str, bucket_urls: list[str]) -> dict:
+    """Run one scenario in work against bucket_urls (BUCKET_URL first, then mirrors)."""
+    _point_launcher(bucket_urls, work)
+    _write(bucket_root, "last_version.json", {"last": "v1", "unsupported": []})
+    if name != "full":
+        ok, message = launcher.check_for_update()
+        if not ok:
+            return {"ok": False, "error": f"setup: {message}"}
+    stats = server.handler.stats
+    with server.handler.stats_lock:
+        stats.update(requests=0, bytes=0)
+
+    if name == "partial":
+        _write(bucket_root, "last_version.json", {"last": "v2", "unsupported": []})
+    if name == "check":
+        # Nothing new: metadata should be revalidated, not downloaded again
+        seconds, (_, message) = _timed(launcher.check_for_update)
+        return {"ok": launcher.LAST_VERSION == "v1", "message": message, "seconds": seconds,
+                "requests": stats["requests"], "bytes": stats["bytes"]}
+    if name == "verify":
+        # A cold pass hashes everything, a warm one only stats files
+        shutil.rmtree(os.path.join(launcher.CONFIG_DIR, "integrity"), ignore_errors=True)
+        seconds, (ok, message) = _timed(launcher.verify_game, False)
+        warm, _ = _timed(launcher.verify_game, False)
+        return {"ok": ok, "message": message, "seconds": seconds, "warm_seconds": warm,
+                "requests": stats["requests"], "bytes": stats["bytes"]}
+    seconds, (ok, message) = _timed(launcher.check_for_update)
+    return {"ok": ok, "message": message, "seconds": seconds,
+            "requests": stats["requests"], "bytes": stats["bytes"]}
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=False)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run(args) -> dict:
+    root = tempfile.mkdtemp(prefix="epta-bench-")
+    try:
+        bucket_root = os.path.join(root, "bucket")
+        sizes = build_bucket(bucket_root, args)
+        server = serve_bucket(bucket_root, args.latency_ms, args.bandwidth_mbps)
+        servers = [server] + [serve_bucket(bucket_root, handler=server.handler) for _ in range(args.mirrors)]
+        bucket_urls = [f"http://127.0.0.1:{s.server_address[1]}" for s in servers]
+        if args.primary_down:
+            bucket_urls.insert(0, _closed_url())
+        results = {}
+        try:
+            for scenario in args.scenarios:
+                runs = []
+                for i in range(args.runs):
+                    work = os.path.join(root, f"{scenario}-{i}")
+                    record = run_scenario(scenario, bucket_root, server, work, bucket_urls)
+                    shutil.rmtree(work, ignore_errors=True)
+                    runs.append(record)
+                    status = f"{record['seconds']:.2f}s" if record.get("ok") else f"FAILED ({record.get('error') or record.get('message')})"
+                    print(f"{scenario} #{i + 1}: {status}")
+                times = [r["seconds"] for r in runs if r.get("ok")]
+                results[scenario] = {
+                    "runs": runs,
+                    "median": statistics.median(times) if times else None,
+                    "min": min(times) if times else None,
+                }
+        finally:
+            for s in servers:
+                s.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "label": args.label,
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "label")},
+        "sizes": sizes,
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str):
+    """Print the median change per scenario between two result files."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("params") != new.get("params"):
+        print("warning: the runs used different parameters")
+    for scenario in SCENARIOS:
+        a = (old["results"].get(scenario) or {}).get("median")
+        b = (new["results"].get(scenario) or {}).get("median")
+        if a is None or b is None:
+            continue
+        print(f"{scenario:8} {a:8.2f}s -> {b:8.2f}s  {(b - a) / a * 100:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mods", type=int, default=150, help="number of mod jars")
+    parser.add_argument("--mod-size-kb", type=int, default=400, help="average mod size")
+    parser.add_argument("--configs", type=int, default=50, help="number of config files")
+    parser.add_argument("--base-files", type=int, default=100, help="files in eptaclientbase.zip")
+    parser.add_argument("--base-size-mb", type=int, default=100, help="uncompressed size of eptaclientbase.zip")
+    parser.add_argument("--changed-percent", type=int, default=10, help="mods replaced by the partial update")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay before every response")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="total bandwidth cap, 0 for none")
+    parser.add_argument("--mirrors", type=int, default=0, help="extra local servers acting as bucket mirrors")
+    parser.add_argument("--primary-down", action="store_true", help="make BUCKET_URL unreachable so every request fails over")
+    parser.add_argument("--runs", type=int, default=3, help="repetitions per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
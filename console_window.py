@@ -0,0 +1,126 @@
+"""Game console window: filtered, bounded view of the game output."""
+import re
+from collections import deque
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from game_console import ConsoleStream
+
+
+LEVELS = {
+    "Все": None,
+    "Предупреждения": re.compile(r"\b(WARN|WARNING|ERROR|FATAL)\b|Exception|^\s+at ", re.IGNORECASE),
+    "Ошибки": re.compile(r"\b(ERROR|FATAL)\b|Exception|^\s+at ", re.IGNORECASE),
+}
+
+
+class ConsoleWindow(QtWidgets.QWidget):
+    """Viewer for a ConsoleStream with a bounded scrollback.
+
+    New lines are appended in one block every interval_ms. Only the last
+    max_lines lines are kept, both in the text view and in the buffer used
+    for filtering, so memory stays flat however much the game prints.
+    """
+
+    def __init__(self, stream: ConsoleStream, max_lines: int = 5000, interval_ms: int = 100, log_dir: str | None = None):
+        super().__init__()
+        self.stream = stream
+        self.lines = deque(maxlen=max_lines)
+        self.log_dir = log_dir
+        self.setWindowTitle("Minecraft Console")
+        self.resize(800, 500)
+
+        self.filter_edit = QtWidgets.QLineEdit()
+        self.filter_edit.setPlaceholderText("Фильтр (текст или /регулярное выражение/)")
+        self.level_box = QtWidgets.QComboBox()
+        self.level_box.addItems(list(LEVELS))
+        self.find_edit = QtWidgets.QLineEdit()
+        self.find_edit.setPlaceholderText("Найти")
+        self.view = QtWidgets.QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setMaximumBlockCount(max_lines)
+        self.view.setUndoRedoEnabled(False)
+        self.view.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+
+        top = QtWidgets.QHBoxLayout()
+        top.addWidget(self.filter_edit, 2)
+        top.addWidget(self.level_box)
+        top.addWidget(self.find_edit, 1)
+        if log_dir:
+            logs_button = QtWidgets.QPushButton("Логи")
+            logs_button.clicked.connect(self.open_logs)
+            top.addWidget(logs_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.view)
+
+        self._matcher = None
+        self._refilter = QtCore.QTimer(self, singleShot=True, interval=200)
+        self._refilter.timeout.connect(self.apply_filter)
+        self.filter_edit.textChanged.connect(self._refilter.start)
+        self.level_box.currentIndexChanged.connect(self.apply_filter)
+        self.find_edit.returnPressed.connect(self.find_next)
+
+        self._timer = QtCore.QTimer(self, interval=interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def _build_matcher(self):
+        text = self.filter_edit.text().strip()
+        level = LEVELS[self.level_box.currentText()]
+        pattern = None
+        if len(text) > 2 and text.startswith("/") and text.endswith("/"):
+            try:
+                pattern = re.compile(text[1:-1], re.IGNORECASE)
+            except re.error:
+                pattern = None
+        needle = text.lower() if text and pattern is None else None
+        if needle is None and pattern is None and level is None:
+            return None
+
+        def matches(line: str) -> bool:
+            if level is not None and not level.search(line):
+                return False
+            if pattern is not None:
+                return bool(pattern.search(line))
+            return needle is None or needle in line.lower()
+
+        return matches
+
+    def _show(self, lines):
+        if self._matcher is not None:
+            lines = [line for line in lines if self._matcher(line)]
+        if not lines:
+            return
+        bar = self.view.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 2
+        self.view.appendPlainText("\n".join(lines))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+    def flush(self):
+        """Move everything the stream collected into the view."""
+        lines = self.stream.drain()
+        if lines:
+            self.lines.extend(lines)
+            self._show(lines)
+
+    def apply_filter(self):
+        """Redraw the view from the buffer with the current filter."""
+        self._matcher = self._build_matcher()
+        self.view.clear()
+        self._show(list(self.lines))
+
+    def find_next(self):
+        text = self.find_edit.text()
+        if text and not self.view.find(text):
+            # Wrap around to the top
+            self.view.moveCursor(QtGui.QTextCursor.Start)
+            self.view.find(text)
+
+    def open_logs(self):
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(self.log_dir))
+
+    def closeEvent(self, event):
+        self.flush()
+        super().closeEvent(event)
@@ -0,0 +1,129 @@
+"""Game output: batched hand-off to a viewer and rotating, compressed log files."""
+import gzip
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+
+LOG_NAME = "console.log"
+
+
+class RotatingLog:
+    """Append-only text log that rolls over into gzip files.
+
+    The current session is written to log_dir/console.log. When it grows past
+    max_bytes, or when a new session starts, the file is renamed and
+    compressed to console-<timestamp>.log.gz on a background thread so the
+    writer never waits on gzip. Only the newest keep archives are retained.
+    """
+
+    def __init__(self, log_dir: str, max_bytes: int, keep: int):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.path = os.path.join(log_dir, LOG_NAME)
+        os.makedirs(log_dir, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            self._roll()
+        self._file = open(self.path, "a", encoding="utf-8", errors="replace")
+        self._size = self._file.tell()
+
+    def write(self, lines):
+        """Write a batch of lines (without trailing newlines)."""
+        if self._file is None:
+            return
+        text = "".join(line + "\n" for line in lines)
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text)
+        if self._size >= self.max_bytes:
+            self._file.close()
+            self._roll()
+            self._file = open(self.path, "a", encoding="utf-8", errors="replace")
+            self._size = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _roll(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        rolled = os.path.join(self.log_dir, f"console-{stamp}.log")
+        n = 1
+        while os.path.exists(rolled) or os.path.exists(rolled + ".gz"):
+            n += 1
+            rolled = os.path.join(self.log_dir, f"console-{stamp}-{n}.log")
+        os.replace(self.path, rolled)
+        threading.Thread(target=self._compress, args=(rolled,), daemon=True).start()
+
+    def _compress(self, path: str):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not compress {path}: {e}")
+            return
+        archives = sorted(
+            (name for name in os.listdir(self.log_dir) if name.startswith("console-") and name.endswith(".log.gz")),
+            key=lambda name: os.path.getmtime(os.path.join(self.log_dir, name)),
+        )
+        for name in archives[:-self.keep] if self.keep else archives:
+            try:
+                os.remove(os.path.join(self.log_dir, name))
+            except OSError:
+                pass
+
+
+class ConsoleStream:
+    """Hand game output from the reader thread to the log and the viewer.
+
+    feed() is called for every line on the reader thread. Lines are written
+    to the log in batches (every flush_lines lines or flush_interval
+    seconds) and queued for the viewer, which takes them with drain(). The
+    viewer queue keeps at most max_pending lines, so a slow or missing
+    viewer cannot make it grow without bound.
+    """
+
+    def __init__(self, log: RotatingLog | None = None, max_pending: int = 5000,
+                 flush_lines: int = 512, flush_interval: float = 0.5):
+        self.log = log
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_pending)
+        self._unlogged = []
+        self._logged_at = time.monotonic()
+
+    def feed(self, line: str):
+        with self._lock:
+            self._pending.append(line)
+        self._unlogged.append(line)
+        if len(self._unlogged) >= self.flush_lines or time.monotonic() - self._logged_at >= self.flush_interval:
+            self.flush_log()
+
+    def flush_log(self):
+        """Write buffered lines to the log file (reader thread only)."""
+        lines, self._unlogged = self._unlogged, []
+        self._logged_at = time.monotonic()
+        if lines and self.log is not None:
+            try:
+                self.log.write(lines)
+            except OSError as e:
+                print(f"Could not write game log: {e}")
+                self.log = None
+
+    def drain(self) -> list[str]:
+        """Return the lines queued for the viewer since the last call."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+
+    def close(self):
+        self.flush_log()
+        if self.log is not None:
+            self.log.close()
@@ -12,6 +12,8 @@ import requests
 
 import warnings
 
+from zip_extract import extract_zip, UnsafePathError
+
 # Suppress PyQt SIP deprecation messages that fire when subclassing widgets
 warnings.filterwarnings(
     "ignore",
@@ -178,14 +180,7 @@ def check_for_update(progress_callback=None):
         if download_asset(zip_url, zip_path, progress_callback):
             try:
                 tmp_dir = tempfile.mkdtemp()
-                with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                    members = zip_ref.infolist()
-                    total_members = len(members) or 1
-                    for i, member in enumerate(members, 1):
-                        zip_ref.extract(member, tmp_dir)
-                        if progress_callback:
-                            percent = i * 100 / total_members
-                            progress_callback("Распаковка", percent)
+                extract_zip(zip_path, tmp_dir, progress_callback)
                 root_items = os.listdir(tmp_dir)
                 if len(root_items) == 1 and os.path.isdir(os.path.join(tmp_dir, root_items[0])):
                     src_root = os.path.join(tmp_dir, root_items[0])
@@ -205,7 +200,7 @@ def check_for_update(progress_callback=None):
                 shutil.rmtree(tmp_dir)
                 if progress_callback:
                     progress_callback("Установка", 100)
-            except zipfile.BadZipFile:
+            except (zipfile.BadZipFile, UnsafePathError):
                 os.remove(zip_path)
                 return False, "Скачанный файл не валидный zip-архив"
             os.remove(zip_path)
@@ -0,0 +1,206 @@
+"""Command-line interface to install, update, verify and launch the client.
+
+Meant for scripted provisioning: no Qt module is imported, the settings
+come from the same config.json as the window, and ``--json`` prints one
+result object on stdout. Progress and log messages go to stderr; the exit
+code is 0 on success and 1 on failure.
+
+    python launcher_cli.py --game-dir "D:/EPTA Client" update
+    python launcher_cli.py --json verify --repair
+    python launcher_cli.py launch --username lab01 --until-title
+    python launcher_cli.py serve --port 8765
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import launcher_core as core
+
+
+class ProgressPrinter:
+    """Report progress callbacks on stderr, once per stage and 5 %."""
+
+    def __init__(self, as_json: bool):
+        self.as_json = as_json
+        self._last = None
+
+    def __call__(self, stage: str, percent: float):
+        key = (stage.split(" ", 1)[0], int(percent) // 5)
+        if key == self._last:
+            return
+        self._last = key
+        if self.as_json:
+            print(json.dumps({"event": "progress", "stage": stage, "percent": round(percent, 1)}, ensure_ascii=False),
+                  file=sys.stderr, flush=True)
+        else:
+            print(f"[{percent:5.1f}%] {stage}", file=sys.stderr, flush=True)
+
+
+def cmd_update(args, progress) -> dict:
+    updated, message = core.check_for_update(progress)
+    return {"ok": updated or message == core.UP_TO_DATE_MESSAGE, "updated": updated, "message": message}
+
+
+def cmd_verify(args, progress) -> dict:
+    ok, message = core.verify_game(args.repair, progress)
+    return {"ok": ok, "message": message}
+
+
+def cmd_rollback(args, progress) -> dict:
+    ok, message = core.rollback_update()
+    return {"ok": ok, "message": message}
+
+
+def cmd_status(args, progress) -> dict:
+    runtime = core.select_java(core.GAME_DIR)
+    staged = core.staged_update()
+    return {
+        "ok": core.LAST_VERSION is not None,
+        "game_dir": core.GAME_DIR,
+        "staged_version": staged and staged["version"],
+        "java": runtime and {"path": runtime["path"], "version": runtime["version"]},
+        "mirrors": core.mirrors.ranked(),
+        "peers": core.peers.ranked(),
+    }
+
+
+def cmd_serve(args, progress) -> dict:
+    if core.peers.start() is None:
+        return {"ok": False, "message": "Не удалось запустить раздачу файлов"}
+    print(f"Раздача файлов на порту {core.peers.port}, Ctrl+C для остановки", file=sys.stderr, flush=True)
+    deadline = time.monotonic() + args.timeout if args.timeout else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    core.peers.stop()
+    return {"ok": True, "message": f"Отдано другим лаунчерам {core.peers.served / 2**20:.1f} МБ",
+            "served_bytes": core.peers.served}
+
+
+def cmd_launch(args, progress) -> dict:
+    milestones = {}
+    reached = threading.Event()
+    exited = threading.Event()
+    exit_codes = []
+
+    def on_milestone(key, label, seconds):
+        milestones[key] = round(seconds, 1)
+        progress(f"Запуск: {label}", len(milestones) * 100 / len(core.LAUNCH_MILESTONES))
+        if key == "title_screen":
+            reached.set()
+
+    def on_exit(exit_code):
+        exit_codes.append(exit_code)
+        exited.set()
+        reached.set()
+
+    try:
+        proc = core.start_game(on_milestone=on_milestone, on_exit=on_exit)
+    except core.LaunchError as e:
+        return {"ok": False, "message": str(e)}
+    deadline = time.monotonic() + args.timeout if args.timeout else None
+    timed_out = False
+    try:
+        event = reached if args.until_title else exited
+        while not event.wait(0.5):
+            if deadline and time.monotonic() > deadline:
+                timed_out = True
+                break
+    except KeyboardInterrupt:
+        pass
+    if proc.poll() is None:
+        proc.terminate()
+    exited.wait(30)
+    if args.until_title:
+        ok = "title_screen" in milestones
+        message = "Игра дошла до главного меню" if ok else "Игра не дошла до главного меню"
+    elif timed_out:
+        ok = False
+        message = f"Игра не завершилась за {args.timeout:g} с"
+    else:
+        ok = exit_codes == [0]
+        message = f"Игра завершилась с кодом {exit_codes[0]}" if exit_codes else "Игра не завершилась"
+    return {"ok": ok, "message": message, "pid": proc.pid, "exit_code": exit_codes[0] if exit_codes else None,
+            "milestones": milestones}
+
+
+COMMANDS = {
+    "update": cmd_update,
+    "verify": cmd_verify,
+    "launch": cmd_launch,
+    "rollback": cmd_rollback,
+    "status": cmd_status,
+    "serve": cmd_serve,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game-dir", help="game directory (default: the one in config.json)")
+    parser.add_argument("--username", help="player name used for launching")
+    parser.add_argument("--ram", type=int, help="fixed heap size in MB instead of the automatic one")
+    parser.add_argument("--json", action="store_true", help="print the result and progress as JSON")
+    parser.add_argument("--peer-cache", action="store_true",
+                        help="fetch files from launchers on the LAN and serve them to others")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("update", help="install the client or update it to the latest version")
+    verify = sub.add_parser("verify", help="check the installed files against the manifest")
+    verify.add_argument("--repair", action="store_true", help="download damaged or missing files again")
+    launch = sub.add_parser("launch", help="start the game and wait for it to exit")
+    launch.add_argument("--until-title", action="store_true",
+                        help="close the game once it reaches the main menu (smoke test)")
+    launch.add_argument("--timeout", type=float, default=0, help="give up after this many seconds")
+    sub.add_parser("rollback", help="go back to the version before the last update")
+    sub.add_parser("status", help="show the installed version, staged update and Java runtime")
+    serve = sub.add_parser("serve", help="serve the object store to other launchers on the LAN")
+    serve.add_argument("--port", type=int, help="TCP port to serve on (default: peer_port or a free one)")
+    serve.add_argument("--timeout", type=float, default=0, help="stop after this many seconds")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # The core logs with print(); keep stdout for the result
+    with contextlib.redirect_stdout(sys.stderr):
+        core.load_config()
+        if args.game_dir:
+            core.GAME_DIR = args.game_dir
+            # The configured version belongs to the configured directory
+            core.LAST_VERSION = core.installed_version(args.game_dir)
+        if args.username:
+            core.USERNAME = args.username
+        if args.ram:
+            core.RAM_MB = args.ram
+            # A fixed heap only applies with automatic memory off
+            key = os.path.abspath(core.GAME_DIR)
+            core.JVM_PROFILES[key] = {**core.JVM_PROFILES.get(key, {}), "auto_memory": False}
+        if args.peer_cache:
+            core.PEER_CACHE = True
+        if getattr(args, "port", None):
+            core.PEER_PORT = args.port
+        core.set_bandwidth_mode(False)
+        core.recover_update_swap()
+        if args.command in ("update", "verify", "launch", "status"):
+            core.mirrors.probe()
+        if core.PEER_CACHE and args.command != "serve":
+            core.peers.start()
+        started = time.perf_counter()
+        result = COMMANDS[args.command](args, ProgressPrinter(args.json))
+    result = {"command": args.command, **result, "version": core.LAST_VERSION,
+              "seconds": round(time.perf_counter() - started, 2)}
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False), file=out)
+    else:
+        print(result.get("message") or json.dumps(result, ensure_ascii=False, indent=1), file=out)
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3628 @@
+"""Install, update, verify and launch logic of the launcher.
+
+Nothing here imports Qt: launcher_v2.py builds the window on top of this
+module and launcher_cli.py drives it from the command line.
+"""
+import os
+import sys
+import json
+import socket
+import zipfile
+import zlib
+import hashlib
+import struct
+import queue
+import tempfile
+import shutil
+import threading
+import subprocess
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import shlex
+import re
+import requests
+from requests.adapters import HTTPAdapter
+import ctypes
+
+from zip_extract import extract_zip, safe_member_path, default_workers, UnsafePathError
+from game_console import ConsoleStream, RotatingLog
+
+try:
+    import bsdiff4
+except ImportError:  # binary patches are optional, updates fall back to full downloads
+    bsdiff4 = None
+
+
+# Helper to locate resources when packaged with PyInstaller
+def resource_path(relative: str) -> str:
+    """Return absolute path to resource for dev and PyInstaller."""
+    if getattr(sys, "frozen", False):
+        base_path = sys._MEIPASS  # type: ignore[attr-defined]
+    else:
+        base_path = os.path.dirname(__file__)
+    return os.path.join(base_path, relative)
+
+
+# GitHub repo for updates (launcher itself)
+LAUNCHER_VERSION = "v1.4"
+LAUNCHER_REPO = "samebr0dy/LauncherEPTA"
+
+# Base URL for client updates
+BUCKET_URL = "https://storage.yandexcloud.net/eptaclient"
+# Other base URLs serving the same files; requests go to the fastest one
+BUCKET_MIRRORS = []
+
+# Configuration paths
+if os.name == "nt":
+    APPDATA_DIR = os.getenv("APPDATA", os.path.expanduser("~"))
+else:
+    APPDATA_DIR = os.path.join(os.path.expanduser("~"), ".config")
+
+CONFIG_DIR = os.path.join(APPDATA_DIR, "EPTAData")
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+
+DEFAULT_GAME_DIR_NAME = ""
+GAME_DIR = os.path.join(os.getcwd(), DEFAULT_GAME_DIR_NAME)
+
+USERNAME = ""
+LAST_VERSION = None
+EXTRA_ARGS = ""
+DEFAULT_RAM_MB = 8192
+RAM_MB = DEFAULT_RAM_MB
+AUTO_UPDATE = False
+# Java binary pinned per game directory, {abs game dir: path}
+JAVA_PATHS = {}
+# Memory and GC choice per game directory, {abs game dir: {"gc": ..., "auto_memory": bool}}
+JVM_PROFILES = {}
+# Installed client version of game directories other than the configured one,
+# {abs game dir: version}; LAST_VERSION belongs to the configured directory
+INSTALLED_VERSIONS = {}
+
+# Parallel download settings, tunable through config.json
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+
+# Shared HTTP client settings, tunable through config.json
+HTTP_POOL_SIZE = 16
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 10
+
+# Large files are fetched as several parallel byte ranges
+DOWNLOAD_SEGMENTS = 4
+SEGMENT_MIN_SIZE = 64 * 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+# Download caps in megabit/s, 0 for none; the playing cap applies while the
+# game runs so background updates do not raise the in-game ping
+BANDWIDTH_IDLE_MBPS = 0
+BANDWIDTH_PLAYING_MBPS = 20
+
+# Download priority classes, lower numbers go first
+PRIORITY_CRITICAL = 0  # client jar and libraries, needed to start at all
+PRIORITY_REQUIRED = 1  # mods
+PRIORITY_OPTIONAL = 2  # configs, scripts and everything else
+
+# Minimum seconds between two progress updates sent to the UI
+PROGRESS_INTERVAL = 0.25
+
+# Extract eptaclientbase.zip while it downloads instead of saving it first
+STREAM_INSTALL = True
+STREAM_READ_SIZE = 256 * 1024
+
+# Content-addressed store shared by all game directories (CONFIG_DIR/store)
+OBJECT_STORE = True
+OBJECT_STORE_DIR = ""
+
+# LAN peer cache: launchers on one network serve each other verified files
+# from their object stores, so a file crosses the uplink once per site
+PEER_CACHE = False
+PEER_PORT = 0  # 0 picks a free port, so several launchers can run on one host
+PEER_ADDRESSES = []  # "host:port" of peers that multicast discovery cannot reach
+PEER_GROUP = "239.255.77.77"
+PEER_DISCOVERY_PORT = 47777
+PEER_DISCOVERY_WAIT = 0.5
+PEER_REFRESH = 60
+PEER_CONNECT_TIMEOUT = 1
+
+# Threads used to hash files while verifying an installation
+VERIFY_WORKERS = os.cpu_count() or 4
+
+# Threads used to unpack eptaclientbase.zip when it is not streamed
+EXTRACT_WORKERS = default_workers()
+
+# Game console scrollback and GAME_DIR/launcher_logs rotation, tunable through config.json
+CONSOLE_MAX_LINES = 5000
+LOG_MAX_SIZE = 10 * 1024 * 1024
+LOG_KEEP = 10
+
+# Garbage collector settings per profile; heap sizes come from jvm_heap_args()
+GC_PROFILES = {
+    "g1": "-XX:+UnlockExperimentalVMOptions -XX:+DisableExplicitGC -XX:MaxGCPauseMillis=200 -XX:+AlwaysPreTouch "
+          "-XX:+ParallelRefProcEnabled -XX:+UseG1GC -XX:G1NewSizePercent=30 -XX:G1MaxNewSizePercent=40 "
+          "-XX:G1HeapRegionSize=8M -XX:G1ReservePercent=20 -XX:InitiatingHeapOccupancyPercent=15 "
+          "-XX:G1HeapWastePercent=5 -XX:G1MixedGCCountTarget=4 -XX:G1MixedGCLiveThresholdPercent=90 "
+          "-XX:G1RSetUpdatingPauseTimePercent=5 -XX:+UseStringDeduplication -XX:MaxTenuringThreshold=1 "
+          "-XX:SurvivorRatio=32",
+    # Larger heaps get bigger regions and a larger young generation
+    "g1_large": "-XX:+UnlockExperimentalVMOptions -XX:+DisableExplicitGC -XX:MaxGCPauseMillis=200 -XX:+AlwaysPreTouch "
+                "-XX:+ParallelRefProcEnabled -XX:+UseG1GC -XX:G1NewSizePercent=40 -XX:G1MaxNewSizePercent=50 "
+                "-XX:G1HeapRegionSize=16M -XX:G1ReservePercent=15 -XX:InitiatingHeapOccupancyPercent=20 "
+                "-XX:G1HeapWastePercent=5 -XX:G1MixedGCCountTarget=4 -XX:G1MixedGCLiveThresholdPercent=90 "
+                "-XX:G1RSetUpdatingPauseTimePercent=5 -XX:+UseStringDeduplication -XX:MaxTenuringThreshold=1 "
+                "-XX:SurvivorRatio=32",
+    "zgc": "-XX:+UseZGC -XX:+DisableExplicitGC -XX:+UseStringDeduplication",
+    "shenandoah": "-XX:+UseShenandoahGC -XX:+DisableExplicitGC -XX:+AlwaysPreTouch -XX:+UseStringDeduplication",
+}
+GC_NAMES = {"g1": "G1", "zgc": "ZGC", "shenandoah": "Shenandoah"}
+
+# Placeholder for JVM arguments. Keeping it on one short line avoids super long source lines.
+JAVA_ARGS_TEMPLATE = r"-Djava.net.preferIPv4Stack=true -Dfile.encoding=UTF-8 -XX:HeapDumpPath=MojangTricksIntelDriversForPerformance_javaw.exe_minecraft.exe.heapdump -Djava.library.path={GAME_DIR}\versions\Forge-1.20.1\natives -Djna.tmpdir={GAME_DIR}\versions\Forge-1.20.1\natives -Dorg.lwjgl.system.SharedLibraryExtractPath={GAME_DIR}\versions\Forge-1.20.1\natives -Dio.netty.native.workdir={GAME_DIR}\versions\Forge-1.20.1\natives -Dminecraft.launcher.brand=java-minecraft-launcher -Dminecraft.launcher.version=1.6.84-j -cp {GAME_DIR}\libraries\cpw\mods\securejarhandler\2.1.10\securejarhandler-2.1.10.jar;{GAME_DIR}\libraries\org\ow2\asm\asm\9.7.1\asm-9.7.1.jar;{GAME_DIR}\libraries\org\ow2\asm\asm-commons\9.7.1\asm-commons-9.7.1.jar;{GAME_DIR}\libraries\org\ow2\asm\asm-tree\9.7.1\asm-tree-9.7.1.jar;{GAME_DIR}\libraries\org\ow2\asm\asm-util\9.7.1\asm-util-9.7.1.jar;{GAME_DIR}\libraries\org\ow2\asm\asm-analysis\9.7.1\asm-analysis-9.7.1.jar;{GAME_DIR}\libraries\net\minecraftforge\accesstransformers\8.0.4\accesstransformers-8.0.4.jar;{GAME_DIR}\libraries\org\antlr\antlr4-runtime\4.9.1\antlr4-runtime-4.9.1.jar;{GAME_DIR}\libraries\net\minecraftforge\eventbus\6.0.5\eventbus-6.0.5.jar;{GAME_DIR}\libraries\net\minecraftforge\forgespi\7.0.1\forgespi-7.0.1.jar;{GAME_DIR}\libraries\net\minecraftforge\coremods\5.2.4\coremods-5.2.4.jar;{GAME_DIR}\libraries\cpw\mods\modlauncher\10.0.9\modlauncher-10.0.9.jar;{GAME_DIR}\libraries\net\minecraftforge\unsafe\0.2.0\unsafe-0.2.0.jar;{GAME_DIR}\libraries\net\minecraftforge\mergetool\1.1.5\mergetool-1.1.5-api.jar;{GAME_DIR}\libraries\com\electronwill\night-config\core\3.6.4\core-3.6.4.jar;{GAME_DIR}\libraries\com\electronwill\night-config\toml\3.6.4\toml-3.6.4.jar;{GAME_DIR}\libraries\org\apache\maven\maven-artifact\3.8.5\maven-artifact-3.8.5.jar;{GAME_DIR}\libraries\net\jodah\typetools\0.6.3\typetools-0.6.3.jar;{GAME_DIR}\libraries\net\minecrell\terminalconsoleappender\1.2.0\terminalconsoleappender-1.2.0.jar;{GAME_DIR}\libraries\org\jline\jline-reader\3.12.1\jline-reader-3.12.1.jar;{GAME_DIR}\libraries\org\jline\jline-terminal\3.12.1\jline-terminal-3.12.1.jar;{GAME_DIR}\libraries\org\spongepowered\mixin\0.8.5\mixin-0.8.5.jar;{GAME_DIR}\libraries\org\openjdk\nashorn\nashorn-core\15.4\nashorn-core-15.4.jar;{GAME_DIR}\libraries\net\minecraftforge\JarJarSelector\0.3.19\JarJarSelector-0.3.19.jar;{GAME_DIR}\libraries\net\minecraftforge\JarJarMetadata\0.3.19\JarJarMetadata-0.3.19.jar;{GAME_DIR}\libraries\cpw\mods\bootstraplauncher\1.1.2\bootstraplauncher-1.1.2.jar;{GAME_DIR}\libraries\net\minecraftforge\JarJarFileSystems\0.3.19\JarJarFileSystems-0.3.19.jar;{GAME_DIR}\libraries\net\minecraftforge\fmlloader\1.20.1-47.4.1\fmlloader-1.20.1-47.4.1.jar;{GAME_DIR}\libraries\net\minecraftforge\fmlearlydisplay\1.20.1-47.4.1\fmlearlydisplay-1.20.1-47.4.1.jar;{GAME_DIR}\libraries\com\github\oshi\oshi-core\6.2.2\oshi-core-6.2.2.jar;{GAME_DIR}\libraries\com\google\code\gson\gson\2.10\gson-2.10.jar;{GAME_DIR}\libraries\com\google\guava\failureaccess\1.0.1\failureaccess-1.0.1.jar;{GAME_DIR}\libraries\com\google\guava\guava\31.1-jre\guava-31.1-jre.jar;{GAME_DIR}\libraries\com\ibm\icu\icu4j\71.1\icu4j-71.1.jar;{GAME_DIR}\libraries\com\mojang\authlib\4.0.43\authlib-4.0.43.jar;{GAME_DIR}\libraries\com\mojang\blocklist\1.0.10\blocklist-1.0.10.jar;{GAME_DIR}\libraries\com\mojang\brigadier\1.1.8\brigadier-1.1.8.jar;{GAME_DIR}\libraries\com\mojang\datafixerupper\6.0.8\datafixerupper-6.0.8.jar;{GAME_DIR}\libraries\com\mojang\logging\1.1.1\logging-1.1.1.jar;{GAME_DIR}\libraries\ru\tln4\empty\0.1\empty-0.1.jar;{GAME_DIR}\libraries\com\mojang\text2speech\1.17.9\text2speech-1.17.9.jar;{GAME_DIR}\libraries\commons-codec\commons-codec\1.15\commons-codec-1.15.jar;{GAME_DIR}\libraries\commons-io\commons-io\2.11.0\commons-io-2.11.0.jar;{GAME_DIR}\libraries\commons-logging\commons-logging\1.2\commons-logging-1.2.jar;{GAME_DIR}\libraries\io\netty\netty-buffer\4.1.82.Final\netty-buffer-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-codec\4.1.82.Final\netty-codec-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-common\4.1.82.Final\netty-common-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-handler\4.1.82.Final\netty-handler-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-resolver\4.1.82.Final\netty-resolver-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-transport-classes-epoll\4.1.82.Final\netty-transport-classes-epoll-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-transport-native-unix-common\4.1.82.Final\netty-transport-native-unix-common-4.1.82.Final.jar;{GAME_DIR}\libraries\io\netty\netty-transport\4.1.82.Final\netty-transport-4.1.82.Final.jar;{GAME_DIR}\libraries\it\unimi\dsi\fastutil\8.5.9\fastutil-8.5.9.jar;{GAME_DIR}\libraries\net\java\dev\jna\jna-platform\5.12.1\jna-platform-5.12.1.jar;{GAME_DIR}\libraries\net\java\dev\jna\jna\5.12.1\jna-5.12.1.jar;{GAME_DIR}\libraries\net\sf\jopt-simple\jopt-simple\5.0.4\jopt-simple-5.0.4.jar;{GAME_DIR}\libraries\org\apache\commons\commons-compress\1.21\commons-compress-1.21.jar;{GAME_DIR}\libraries\org\apache\commons\commons-lang3\3.12.0\commons-lang3-3.12.0.jar;{GAME_DIR}\libraries\org\apache\httpcomponents\httpclient\4.5.13\httpclient-4.5.13.jar;{GAME_DIR}\libraries\org\apache\httpcomponents\httpcore\4.4.15\httpcore-4.4.15.jar;{GAME_DIR}\libraries\org\apache\logging\log4j\log4j-api\2.19.0\log4j-api-2.19.0.jar;{GAME_DIR}\libraries\org\apache\logging\log4j\log4j-core\2.19.0\log4j-core-2.19.0.jar;{GAME_DIR}\libraries\org\apache\logging\log4j\log4j-slf4j2-impl\2.19.0\log4j-slf4j2-impl-2.19.0.jar;{GAME_DIR}\libraries\org\joml\joml\1.10.5\joml-1.10.5.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-glfw\3.3.1\lwjgl-glfw-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-glfw\3.3.1\lwjgl-glfw-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-glfw\3.3.1\lwjgl-glfw-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-glfw\3.3.1\lwjgl-glfw-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-jemalloc\3.3.1\lwjgl-jemalloc-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-jemalloc\3.3.1\lwjgl-jemalloc-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-jemalloc\3.3.1\lwjgl-jemalloc-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-jemalloc\3.3.1\lwjgl-jemalloc-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-openal\3.3.1\lwjgl-openal-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-openal\3.3.1\lwjgl-openal-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-openal\3.3.1\lwjgl-openal-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-openal\3.3.1\lwjgl-openal-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-opengl\3.3.1\lwjgl-opengl-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-opengl\3.3.1\lwjgl-opengl-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-opengl\3.3.1\lwjgl-opengl-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-opengl\3.3.1\lwjgl-opengl-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-stb\3.3.1\lwjgl-stb-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-stb\3.3.1\lwjgl-stb-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-stb\3.3.1\lwjgl-stb-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-stb\3.3.1\lwjgl-stb-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-tinyfd\3.3.1\lwjgl-tinyfd-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-tinyfd\3.3.1\lwjgl-tinyfd-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-tinyfd\3.3.1\lwjgl-tinyfd-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl-tinyfd\3.3.1\lwjgl-tinyfd-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl\3.3.1\lwjgl-3.3.1.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl\3.3.1\lwjgl-3.3.1-natives-windows.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl\3.3.1\lwjgl-3.3.1-natives-windows-arm64.jar;{GAME_DIR}\libraries\org\lwjgl\lwjgl\3.3.1\lwjgl-3.3.1-natives-windows-x86.jar;{GAME_DIR}\libraries\org\slf4j\slf4j-api\2.0.1\slf4j-api-2.0.1.jar;{GAME_DIR}\versions\Forge-1.20.1\Forge-1.20.1.jar -Djava.net.preferIPv6Addresses=system -DignoreList=bootstraplauncher,securejarhandler,asm-commons,asm-util,asm-analysis,asm-tree,asm,JarJarFileSystems,client-extra,fmlcore,javafmllanguage,lowcodelanguage,mclanguage,forge-,Forge-1.20.1.jar -DmergeModules=jna-5.10.0.jar,jna-platform-5.10.0.jar -DlibraryDirectory={GAME_DIR}\libraries -p {GAME_DIR}\libraries/cpw/mods/bootstraplauncher/1.1.2/bootstraplauncher-1.1.2.jar;{GAME_DIR}\libraries/cpw/mods/securejarhandler/2.1.10/securejarhandler-2.1.10.jar;{GAME_DIR}\libraries/org/ow2/asm/asm-commons/9.7.1/asm-commons-9.7.1.jar;{GAME_DIR}\libraries/org/ow2/asm/asm-util/9.7.1/asm-util-9.7.1.jar;{GAME_DIR}\libraries/org/ow2/asm/asm-analysis/9.7.1/asm-analysis-9.7.1.jar;{GAME_DIR}\libraries/org/ow2/asm/asm-tree/9.7.1/asm-tree-9.7.1.jar;{GAME_DIR}\libraries/org/ow2/asm/asm/9.7.1/asm-9.7.1.jar;{GAME_DIR}\libraries/net/minecraftforge/JarJarFileSystems/0.3.19/JarJarFileSystems-0.3.19.jar --add-modules ALL-MODULE-PATH --add-opens java.base/java.util.jar=cpw.mods.securejarhandler --add-opens java.base/java.lang.invoke=cpw.mods.securejarhandler --add-exports java.base/sun.security.util=cpw.mods.securejarhandler --add-exports jdk.naming.dns/com.sun.jndi.dns=java.naming -Xss2M cpw.mods.bootstraplauncher.BootstrapLauncher --version Forge-1.20.1 --gameDir {GAME_DIR} --assetsDir {GAME_DIR}\assets --assetIndex 5 --uuid c3a98f5351b53ff38de9d26d9504690c --accessToken c3a98f5351b53ff38de9d26d9504690c --clientId  --xuid  --userType legacy --versionType modified --width 925 --height 530 --launchTarget forgeclient --fml.forgeVersion 47.4.1 --fml.mcVersion 1.20.1 --fml.forgeGroup net.minecraftforge --fml.mcpVersion 20230612.114412"
+
+DEFAULT_CMD_TEMPLATE = r"java @{ARGS_FILE}"
+
+
+# Launch argument files are cached here and reused while nothing changes
+ARGS_CACHE_DIR = os.path.join(CONFIG_DIR, "args")
+ARGS_CACHE_KEEP = 5
+
+# Class data sharing archives of the game classpath, one per install
+APP_CDS = True
+CDS_DIR = os.path.join(CONFIG_DIR, "cds")
+
+
+class MissingLibrariesError(Exception):
+    """Raised when jars referenced by the launch arguments are missing."""
+
+    def __init__(self, missing: list[str]):
+        super().__init__(f"{len(missing)} missing file(s)")
+        self.missing = missing
+
+
+def _classpath_entries(args: str) -> list[str]:
+    """Return every path listed after -cp and -p in a formatted argument string."""
+    tokens = args.split()
+    entries = []
+    for flag, value in zip(tokens, tokens[1:]):
+        if flag in ("-cp", "-p", "--module-path", "-classpath"):
+            entries += [p for p in value.split(";") if p]
+    return entries
+
+
+def _local_path(path: str) -> str:
+    """Turn a template path with Windows separators into a native one."""
+    return os.path.normpath(path.replace("\\", "/"))
+
+
+def get_args_file(game_dir: str, jvm_args: str, version: str | None = None) -> str:
+    """Return a JVM argument file for game_dir, building it only when needed.
+
+    The file lives in ARGS_CACHE_DIR under a name derived from the game
+    directory, the argument template, the GC flags and the installed
+    version, so an unchanged launch reuses it. All classpath and
+    module-path jars are checked in one pass first, also when the file is
+    reused, and MissingLibrariesError lists the ones that are absent.
+    """
+    args = JAVA_ARGS_TEMPLATE.format(GAME_DIR=game_dir)
+    missing = [p for p in _classpath_entries(args) if not os.path.isfile(_local_path(p))]
+    if missing:
+        raise MissingLibrariesError(missing)
+
+    template_hash = hashlib.sha1(JAVA_ARGS_TEMPLATE.encode("utf-8")).hexdigest()
+    key_src = f"{os.path.abspath(game_dir)}|{template_hash}|{jvm_args}|{version}"
+    key = hashlib.sha1(key_src.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(ARGS_CACHE_DIR, f"args_{key}.txt")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(ARGS_CACHE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{jvm_args} {args}")
+    os.replace(tmp_path, path)
+
+    # Drop files for settings that have not been used for a while
+    cached = sorted(
+        (os.path.join(ARGS_CACHE_DIR, n) for n in os.listdir(ARGS_CACHE_DIR) if n.startswith("args_")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for old in cached[ARGS_CACHE_KEEP:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return path
+
+
+# Detected Java runtimes, keyed by binary path and validated by its mtime
+JAVA_CACHE_FILE = os.path.join(CONFIG_DIR, "java_runtimes.json")
+JAVA_BINARY = "java.exe" if os.name == "nt" else "java"
+_java_lock = threading.Lock()
+
+
+def _java_search_roots() -> list[str]:
+    """Return directories that usually contain one JDK/JRE per subdirectory."""
+    if os.name == "nt":
+        roots = []
+        for env in ("ProgramFiles", "ProgramFiles(x86)", "ProgramW6432", "LOCALAPPDATA"):
+            base = os.getenv(env)
+            if not base:
+                continue
+            for vendor in ("Java", "Eclipse Adoptium", "Eclipse Foundation", "AdoptOpenJDK", "Zulu",
+                           "Microsoft", "BellSoft", "Amazon Corretto", "Semeru", "Programs"):
+                roots.append(os.path.join(base, vendor))
+        return roots
+    if sys.platform == "darwin":
+        return ["/Library/Java/JavaVirtualMachines", os.path.expanduser("~/Library/Java/JavaVirtualMachines")]
+    return ["/usr/lib/jvm", "/usr/java", "/opt", os.path.expanduser("~/.jdks"), os.path.expanduser("~/.sdkman/candidates/java")]
+
+
+def _java_candidates() -> list[str]:
+    """Return paths of java binaries found in JAVA_HOME, PATH and common JDK folders."""
+    found = []
+    java_home = os.getenv("JAVA_HOME")
+    if java_home:
+        found.append(os.path.join(java_home, "bin", JAVA_BINARY))
+    on_path = shutil.which("java")
+    if on_path:
+        found.append(on_path)
+    for root in _java_search_roots():
+        try:
+            names = os.listdir(root)
+        except OSError:
+            continue
+        for name in names:
+            for home in (os.path.join(root, name), os.path.join(root, name, "Contents", "Home")):
+                found.append(os.path.join(home, "bin", JAVA_BINARY))
+    result = []
+    seen = set()
+    for path in found:
+        if not os.path.isfile(path):
+            continue
+        key = os.path.normcase(os.path.realpath(path))
+        if key not in seen:
+            seen.add(key)
+            result.append(os.path.realpath(path))
+    return result
+
+
+def _java_major(version: str) -> int:
+    """Return the feature release of a Java version string (1.8.0_382 -> 8)."""
+    match = re.match(r"(\d+)(?:\.(\d+))?", version or "")
+    if not match:
+        return 0
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+    return major
+
+
+def _probe_java(binary: str) -> dict | None:
+    """Describe the runtime of binary, reading its release file when possible."""
+    info = {"path": binary, "version": "", "vendor": "", "arch": ""}
+    release = os.path.join(os.path.dirname(os.path.dirname(binary)), "release")
+    try:
+        with open(release, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                value = value.strip().strip('"')
+                if key == "JAVA_VERSION":
+                    info["version"] = value
+                elif key == "IMPLEMENTOR":
+                    info["vendor"] = value
+                elif key == "OS_ARCH":
+                    info["arch"] = value
+    except OSError:
+        pass
+    if not info["version"]:
+        try:
+            result = subprocess.run([binary, "-XshowSettings:properties", "-version"], capture_output=True,
+                                    text=True, check=False, timeout=15,
+                                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        except (OSError, subprocess.SubprocessError):
+            return None
+        output = (result.stdout or "") + (result.stderr or "")
+        for prop, key in (("java.version", "version"), ("java.vendor", "vendor"), ("os.arch", "arch")):
+            match = re.search(rf"^\s*{re.escape(prop)} = (.+)$", output, re.MULTILINE)
+            if match:
+                info[key] = match.group(1).strip()
+        if not info["version"]:
+            match = re.search(r'version "([^"]+)"', output)
+            if not match:
+                return None
+            info["version"] = match.group(1)
+    info["major"] = _java_major(info["version"])
+    info["gcs"] = _probe_gcs(binary)
+    return info
+
+
+def _probe_gcs(binary: str) -> list[str]:
+    """Return the GC_NAMES keys the runtime at binary was built with.
+
+    -XX:+PrintFlagsFinal only lists the flags of collectors compiled into the
+    JVM, which tells e.g. builds with and without Shenandoah apart.
+    """
+    try:
+        result = subprocess.run([binary, "-XX:+UnlockExperimentalVMOptions", "-XX:+PrintFlagsFinal", "-version"],
+                                capture_output=True, text=True, check=False, timeout=15,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    except (OSError, subprocess.SubprocessError):
+        return ["g1"]
+    flags = set(re.findall(r"\bbool\s+(Use\w+GC)\b", result.stdout or ""))
+    gcs = ["g1"]
+    if "UseZGC" in flags:
+        gcs.append("zgc")
+    if "UseShenandoahGC" in flags:
+        gcs.append("shenandoah")
+    return gcs
+
+
+def find_java_runtimes() -> list[dict]:
+    """Return every detected Java runtime, newest first.
+
+    Probe results are cached in JAVA_CACHE_FILE together with the binary's
+    mtime and size, so on later launches a runtime is only stat'ed. Probing
+    can take seconds per runtime; concurrent callers wait for one pass.
+    """
+    with _java_lock:
+        return _find_java_runtimes()
+
+
+def _find_java_runtimes() -> list[dict]:
+    cache = _load_json_file(JAVA_CACHE_FILE)
+    fresh = {}
+    runtimes = []
+    for binary in _java_candidates():
+        try:
+            st = os.stat(binary)
+        except OSError:
+            continue
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = cache.get(binary)
+        if entry and entry.get("stamp") == stamp and "gcs" in entry["info"]:
+            info = entry["info"]
+        else:
+            info = _probe_java(binary)
+            if info is None:
+                continue
+        fresh[binary] = {"stamp": stamp, "info": info}
+        runtimes.append(info)
+    if fresh != cache:
+        try:
+            os.makedirs(CONFIG_DIR, exist_ok=True)
+            _save_json_file(JAVA_CACHE_FILE, fresh)
+        except OSError:
+            pass
+    runtimes.sort(key=lambda r: r["major"], reverse=True)
+    return runtimes
+
+
+def select_java(game_dir: str, min_version: int = 17) -> dict | None:
+    """Return the runtime to launch game_dir with.
+
+    A runtime pinned for this install in JAVA_PATHS wins if it is still
+    usable; otherwise Java 17 is preferred, then the newest suitable one.
+    """
+    runtimes = [r for r in find_java_runtimes() if r["major"] >= min_version]
+    pinned = JAVA_PATHS.get(os.path.abspath(game_dir))
+    if pinned:
+        for runtime in runtimes:
+            if os.path.normcase(runtime["path"]) == os.path.normcase(os.path.realpath(pinned)):
+                return runtime
+    if not runtimes:
+        return None
+    return min(runtimes, key=lambda r: (r["major"] != min_version, -r["major"]))
+
+
+def check_java(min_version: int = 17) -> dict | None:
+    """Return the Java runtime to use for GAME_DIR, or None if there is none."""
+    return select_java(GAME_DIR, min_version)
+
+
+def system_memory() -> tuple[int, int]:
+    """Return (total, available) physical memory in MB; (0, 0) if unknown."""
+    if os.name == "nt":
+        from ctypes import wintypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", wintypes.DWORD),
+                ("dwMemoryLoad", wintypes.DWORD),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys // 2**20, status.ullAvailPhys // 2**20
+        return 0, 0
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            values = {line.split(":")[0]: int(line.split()[1]) for line in f if line.count(":") == 1}
+        return values.get("MemTotal", 0) // 1024, values.get("MemAvailable", values.get("MemFree", 0)) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return 0, 0
+    return total, total
+
+
+def count_mods(game_dir: str) -> int:
+    """Return the number of mod jars installed in game_dir."""
+    try:
+        return sum(1 for name in os.listdir(os.path.join(game_dir, "mods")) if name.endswith(".jar"))
+    except OSError:
+        return 0
+
+
+def recommend_jvm_profile(total_mb: int, available_mb: int, cores: int, mods: int, runtime: dict | None) -> dict:
+    """Suggest heap sizes and a collector for the given machine and mod count.
+
+    The heap grows with the number of mods but always leaves a quarter of
+    RAM (at least 2 GB) to the system. The initial heap is kept within what
+    is free right now so starting the game does not push other programs
+    into swap. ZGC is only chosen on Java 21+ (generational ZGC) with enough
+    memory and cores to benefit from it; G1 is the default everywhere else.
+    """
+    need = 3072 + 24 * mods
+    if total_mb:
+        limit = total_mb - max(2048, total_mb // 4)
+        xmx = min(need, limit)
+    else:
+        xmx = need
+    xmx = max(2048, min(16384, xmx)) // 512 * 512
+    xms = min(xmx // 2, max(1024, available_mb - 1024)) if available_mb else xmx // 2
+    xms = max(1024, xms // 256 * 256)
+
+    gcs = (runtime or {}).get("gcs") or ["g1"]
+    major = (runtime or {}).get("major", 17)
+    gc = "g1"
+    if "zgc" in gcs and major >= 21 and xmx >= 8192 and cores >= 8:
+        gc = "zgc"
+    return {"xmx": xmx, "xms": xms, "gc": gc}
+
+
+def jvm_profile(game_dir: str, runtime: dict | None, ram_mb: int) -> dict:
+    """Return the memory and GC settings to launch game_dir with.
+
+    The recommendation is overridden by the per-install choice in
+    JVM_PROFILES: a fixed collector, and ram_mb as the heap when automatic
+    memory is switched off. A collector the runtime lacks falls back to G1.
+    """
+    total, available = system_memory()
+    profile = recommend_jvm_profile(total, available, os.cpu_count() or 1, count_mods(game_dir), runtime)
+    profile["recommended"] = dict(profile)
+    choice = JVM_PROFILES.get(os.path.abspath(game_dir), {})
+    if not memory_is_automatic(game_dir) and ram_mb:
+        profile["xmx"] = ram_mb
+        profile["xms"] = min(profile["xms"], ram_mb)
+    gc = choice.get("gc", "auto")
+    if gc in GC_NAMES and gc in ((runtime or {}).get("gcs") or ["g1"]):
+        profile["gc"] = gc
+    profile["total_mb"] = total
+    profile["available_mb"] = available
+    return profile
+
+
+def memory_is_automatic(game_dir: str) -> bool:
+    """Return whether the heap of game_dir is sized automatically.
+
+    Without a choice in JVM_PROFILES this is only the case while ram_mb has
+    its default, so a heap size set before automatic sizing existed is kept.
+    """
+    choice = JVM_PROFILES.get(os.path.abspath(game_dir), {})
+    return choice.get("auto_memory", RAM_MB == DEFAULT_RAM_MB)
+
+
+def jvm_heap_args(profile: dict) -> list[str]:
+    """Return the heap size flags for a profile from jvm_profile().
+
+    They are passed on the command line rather than cached with the other
+    flags: the initial heap follows the free memory and changes between
+    launches.
+    """
+    return [f"-Xmx{profile['xmx']}M", f"-Xms{profile['xms']}M"]
+
+
+def jvm_gc_args(profile: dict, runtime: dict | None) -> str:
+    """Return the GC flags for a profile from jvm_profile()."""
+    gc = profile["gc"]
+    if gc == "g1" and profile["xmx"] >= 12288:
+        flags = GC_PROFILES["g1_large"]
+    else:
+        flags = GC_PROFILES[gc]
+    major = (runtime or {}).get("major", 17)
+    if gc == "zgc" and 21 <= major < 23:
+        # Generational mode is opt-in on 21 and 22 and the default afterwards
+        flags += " -XX:+ZGenerational"
+    return flags
+
+
+def _cds_fingerprint(game_dir: str, runtime: dict, jvm_args: str) -> str:
+    """Hash everything a class data sharing archive depends on.
+
+    That is the Java binary, the GC flags, every classpath and module-path
+    jar and the installed mods, each by path, size and mtime, so replacing
+    any of them yields a new fingerprint.
+    """
+    h = hashlib.sha1()
+    h.update(f"{runtime['path']}|{runtime.get('version')}|{jvm_args}\n".encode("utf-8"))
+    paths = [runtime["path"]]
+    paths += [_local_path(p) for p in _classpath_entries(JAVA_ARGS_TEMPLATE.format(GAME_DIR=game_dir))]
+    mods_dir = os.path.join(game_dir, "mods")
+    try:
+        paths += sorted(os.path.join(mods_dir, n) for n in os.listdir(mods_dir) if n.endswith(".jar"))
+    except OSError:
+        pass
+    for path in paths:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        except OSError:
+            h.update(f"{path}|missing\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def cds_args(game_dir: str, runtime: dict, jvm_args: str) -> tuple[list[str], str]:
+    """Return the JVM flags that create or use the class data sharing archive.
+
+    Archives live in CDS_DIR/<install>/<fingerprint>.jsa; archives of older
+    fingerprints are deleted, so a changed JDK, library or mod set starts
+    over with a fresh one. Java 19+ maintains the archive itself through
+    -XX:+AutoCreateSharedArchive. On Java 13-18 the first launch is the
+    training run: -XX:ArchiveClassesAtExit dumps the loaded classes when the
+    game exits, and later launches map them with -XX:SharedArchiveFile.
+    The second value is "use", "dump", "auto" or "off" for the records.
+    Raise OSError if the archive directory cannot be prepared.
+    """
+    major = runtime.get("major", 0)
+    if not APP_CDS or major < 13:
+        return [], "off"
+    install = hashlib.sha1(os.path.abspath(game_dir).encode("utf-8")).hexdigest()[:12]
+    archive_dir = os.path.join(CDS_DIR, install)
+    fingerprint = _cds_fingerprint(game_dir, runtime, jvm_args)
+    archive = os.path.join(archive_dir, f"{fingerprint}.jsa")
+    os.makedirs(archive_dir, exist_ok=True)
+    for name in os.listdir(archive_dir):
+        if name != os.path.basename(archive):
+            os.remove(os.path.join(archive_dir, name))
+    if major >= 19:
+        return ["-XX:+AutoCreateSharedArchive", f"-XX:SharedArchiveFile={archive}"], "auto"
+    if os.path.isfile(archive) and os.path.getsize(archive):
+        return [f"-XX:SharedArchiveFile={archive}"], "use"
+    return [f"-XX:ArchiveClassesAtExit={archive}"], "dump"
+
+
+def _config_value(data: dict, key: str, default, convert=None):
+    """Return data[key] passed through convert, or default if it is missing or invalid."""
+    if key not in data:
+        return default
+    try:
+        return convert(data[key]) if convert else data[key]
+    except (TypeError, ValueError, AttributeError):
+        return default
+
+
+def _string_list(value) -> list[str]:
+    if not isinstance(value, list):
+        raise TypeError("expected a list")
+    return [str(item) for item in value]
+
+
+def _at_least(minimum, convert=int):
+    return lambda value: max(minimum, convert(value))
+
+
+def load_config():
+    """Load launcher configuration from CONFIG_FILE.
+
+    Every value is converted before any setting changes; a missing or
+    malformed value keeps its default, so a bad key never leaves the
+    configuration half applied.
+    """
+    data = _read_config_file()
+    if not data:
+        return
+    mb = 1024 * 1024
+    values = {
+        "GAME_DIR": _config_value(data, "game_dir", GAME_DIR, str),
+        "USERNAME": _config_value(data, "username", "", str),
+        "LAST_VERSION": _config_value(data, "last_version", None, lambda v: v if v is None else str(v)),
+        "EXTRA_ARGS": _config_value(data, "extra_args", "", str),
+        "RAM_MB": _config_value(data, "ram_mb", RAM_MB, int),
+        "AUTO_UPDATE": _config_value(data, "auto_update", AUTO_UPDATE, bool),
+        "JAVA_PATHS": _config_value(data, "java_paths", {}, lambda v: dict(v or {})),
+        "JVM_PROFILES": _config_value(data, "jvm_profiles", {}, lambda v: dict(v or {})),
+        "INSTALLED_VERSIONS": _config_value(data, "installed_versions", {}, lambda v: dict(v or {})),
+        "DOWNLOAD_WORKERS": _config_value(data, "download_workers", DOWNLOAD_WORKERS, _at_least(1)),
+        "DOWNLOAD_RETRIES": _config_value(data, "download_retries", DOWNLOAD_RETRIES, _at_least(1)),
+        "HTTP_POOL_SIZE": _config_value(data, "http_pool_size", HTTP_POOL_SIZE, _at_least(1)),
+        "HTTP_CONNECT_TIMEOUT": _config_value(data, "http_connect_timeout", HTTP_CONNECT_TIMEOUT, float),
+        "HTTP_READ_TIMEOUT": _config_value(data, "http_read_timeout", HTTP_READ_TIMEOUT, float),
+        "DOWNLOAD_SEGMENTS": _config_value(data, "download_segments", DOWNLOAD_SEGMENTS, _at_least(1)),
+        "SEGMENT_MIN_SIZE": _config_value(data, "segment_min_size_mb", SEGMENT_MIN_SIZE, lambda v: max(1, int(v)) * mb),
+        "STREAM_INSTALL": _config_value(data, "stream_install", STREAM_INSTALL, bool),
+        "OBJECT_STORE": _config_value(data, "object_store", OBJECT_STORE, bool),
+        "OBJECT_STORE_DIR": _config_value(data, "object_store_dir", OBJECT_STORE_DIR, lambda v: str(v or "")),
+        "EXTRACT_WORKERS": _config_value(data, "extract_workers", EXTRACT_WORKERS, _at_least(1)),
+        "APP_CDS": _config_value(data, "app_cds", APP_CDS, bool),
+        "WARMUP": _config_value(data, "warmup", WARMUP, bool),
+        "BUCKET_MIRRORS": _config_value(data, "bucket_mirrors", [], lambda v: [u.rstrip("/") for u in _string_list(v or [])]),
+        "PEER_CACHE": _config_value(data, "peer_cache", PEER_CACHE, bool),
+        "PEER_PORT": _config_value(data, "peer_port", PEER_PORT, int),
+        "PEER_ADDRESSES": _config_value(data, "peer_addresses", [], lambda v: _string_list(v or [])),
+        "PEER_DISCOVERY_PORT": _config_value(data, "peer_discovery_port", PEER_DISCOVERY_PORT, int),
+        "BANDWIDTH_IDLE_MBPS": _config_value(data, "bandwidth_idle_mbps", BANDWIDTH_IDLE_MBPS, _at_least(0.0, float)),
+        "BANDWIDTH_PLAYING_MBPS": _config_value(data, "bandwidth_playing_mbps", BANDWIDTH_PLAYING_MBPS,
+                                                _at_least(0.0, float)),
+        "BACKGROUND_STAGING": _config_value(data, "background_staging", BACKGROUND_STAGING, bool),
+        "STAGING_INTERVAL": _config_value(data, "staging_interval_min", STAGING_INTERVAL, lambda v: max(1, int(v)) * 60),
+        "CONSOLE_MAX_LINES": _config_value(data, "console_max_lines", CONSOLE_MAX_LINES, _at_least(100)),
+        "LOG_KEEP": _config_value(data, "log_keep", LOG_KEEP, _at_least(0)),
+        "LOG_MAX_SIZE": _config_value(data, "log_max_size_mb", LOG_MAX_SIZE, lambda v: max(1, int(v)) * mb),
+    }
+    globals().update(values)
+
+
+def _read_config_file() -> dict:
+    """Return the raw contents of CONFIG_FILE or an empty dict."""
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_config(game_dir: str, username: str, version: str | None, extra_args: str, ram_mb: int, auto_update: bool):
+    """Save launcher configuration to CONFIG_FILE.
+
+    Keys that are only edited by hand (download tuning etc.) are preserved.
+    """
+    update_config_values({
+        "game_dir": game_dir,
+        "username": username,
+        "last_version": version,
+        "extra_args": extra_args,
+        "ram_mb": ram_mb,
+        "auto_update": auto_update,
+    })
+
+
+def configured_game_dir() -> str:
+    """Return the game directory saved in CONFIG_FILE, or the default one."""
+    return _read_config_file().get("game_dir") or os.path.join(os.getcwd(), DEFAULT_GAME_DIR_NAME)
+
+
+def installed_version(game_dir: str) -> str | None:
+    """Return the client version recorded for game_dir, or None if unknown."""
+    key = os.path.abspath(game_dir)
+    if key == os.path.abspath(configured_game_dir()):
+        return LAST_VERSION
+    return INSTALLED_VERSIONS.get(key)
+
+
+def update_config_values(values: dict):
+    """Merge values into CONFIG_FILE, keeping every other key."""
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    data = _read_config_file()
+    data.update(values)
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+_http_session = None
+_http_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide HTTP session.
+
+    All launcher traffic goes through this session so connections to the
+    bucket and GitHub are kept alive and reused between requests.
+    """
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            session = requests.Session()
+            # Enough connections per host for every download worker
+            pool_size = max(HTTP_POOL_SIZE, DOWNLOAD_WORKERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = f"EPTALauncher/{LAUNCHER_VERSION}"
+            _http_session = session
+        return _http_session
+
+
+def reset_http_session():
+    """Close the shared session so the next request uses fresh settings."""
+    global _http_session
+    with _http_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+
+MIRROR_CACHE_NAME = "mirrors.json"
+MIRROR_PROBE_TTL = 6 * 3600
+MIRROR_PENALTY = 300
+MIRROR_PROBE_BYTES = 256 * 1024
+
+
+class MirrorSet:
+    """Rank the bucket mirrors and fail over between them.
+
+    probe() measures the latency (last_version.json) and throughput (the
+    first MIRROR_PROBE_BYTES of the client archive) of every mirror and
+    caches the result in CONFIG_DIR for MIRROR_PROBE_TTL. Mirrors are ranked
+    by the estimated time to fetch a 1 MB file; a mirror that fails is put
+    last for MIRROR_PENALTY seconds. BUCKET_URL keeps its place in front
+    until the mirrors have been probed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {}
+        self._failed_until = {}
+
+    def mirrors(self) -> list[str]:
+        return list(dict.fromkeys([BUCKET_URL.rstrip("/")] + BUCKET_MIRRORS))
+
+    def ranked(self) -> list[str]:
+        mirrors = self.mirrors()
+        if len(mirrors) == 1:
+            return mirrors
+        now = time.monotonic()
+        with self._lock:
+            def score(item):
+                index, mirror = item
+                stats = self.stats.get(mirror)
+                if stats is None:
+                    estimate = float("inf")
+                elif not stats.get("ok"):
+                    estimate = float("inf")
+                    index += len(mirrors)
+                else:
+                    estimate = stats["latency"] + 1024 * 1024 / max(stats.get("throughput") or 1, 1)
+                return self._failed_until.get(mirror, 0) > now, estimate, index
+            return [mirror for _, mirror in sorted(enumerate(mirrors), key=score)]
+
+    def _mirror_of(self, url: str) -> str | None:
+        for mirror in self.mirrors():
+            if url.startswith(mirror + "/"):
+                return mirror
+        return None
+
+    def candidates(self, url: str) -> list[str]:
+        """Return url rewritten for every mirror, best first."""
+        mirror = self._mirror_of(url)
+        if mirror is None:
+            return [url]
+        rest = url[len(mirror):]
+        return [m + rest for m in self.ranked()]
+
+    def failed(self, url: str):
+        mirror = self._mirror_of(url)
+        if mirror is not None and len(self.mirrors()) > 1:
+            with self._lock:
+                self._failed_until[mirror] = time.monotonic() + MIRROR_PENALTY
+
+    def _probe_one(self, mirror: str) -> dict:
+        session = get_http_session()
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        stats = {"ok": False, "checked": time.time()}
+        try:
+            started = time.perf_counter()
+            with session.get(f"{mirror}/last_version.json", timeout=timeout, stream=True) as resp:
+                stats["latency"] = time.perf_counter() - started
+                if resp.status_code != 200:
+                    return stats
+            stats["ok"] = True
+            headers = {"Range": f"bytes=0-{MIRROR_PROBE_BYTES - 1}"}
+            started = time.perf_counter()
+            with session.get(f"{mirror}/EPTAClient/eptaclientbase.zip", timeout=timeout, stream=True, headers=headers) as resp:
+                if resp.status_code in (200, 206):
+                    received = 0
+                    for chunk in resp.iter_content(chunk_size=64 * 1024):
+                        received += len(chunk)
+                        if received >= MIRROR_PROBE_BYTES:
+                            break
+                    stats["throughput"] = received / max(time.perf_counter() - started, 1e-3)
+        except requests.RequestException:
+            pass
+        return stats
+
+    def probe(self, force: bool = False):
+        """Measure every mirror, or load a recent measurement from the cache.
+
+        A fresh measurement is written to the metrics file as a mirror_probe
+        span with the resulting order.
+        """
+        mirrors = self.mirrors()
+        if len(mirrors) == 1:
+            return
+        path = os.path.join(CONFIG_DIR, MIRROR_CACHE_NAME)
+        cached = _load_json_file(path)
+        if not force and set(cached) == set(mirrors) and all(
+                time.time() - stats.get("checked", 0) < MIRROR_PROBE_TTL for stats in cached.values()):
+            with self._lock:
+                self.stats = cached
+            return
+        with stage("mirror_probe", mirrors=len(mirrors)) as span:
+            with ThreadPoolExecutor(max_workers=len(mirrors)) as pool:
+                stats = dict(zip(mirrors, pool.map(self._probe_one, mirrors)))
+            with self._lock:
+                self.stats = stats
+            span.set(ranked=self.ranked())
+            try:
+                os.makedirs(CONFIG_DIR, exist_ok=True)
+                _save_json_file(path, stats)
+            except OSError as e:
+                span.fail(f"could not save mirror measurements: {e}")
+
+
+mirrors = MirrorSet()
+
+
+@contextmanager
+def _mirror_stream(response: requests.Response):
+    """Mark the mirror behind response as failed if reading its body breaks or stalls."""
+    try:
+        yield
+    except requests.RequestException:
+        mirrors.failed(response.url)
+        raise
+
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request through the shared session and record how long it took.
+
+    Requests for BUCKET_URL go to the best mirror. If it cannot be reached,
+    times out, answers with a server error or lacks the file, the next
+    mirror is tried.
+    """
+    candidates = mirrors.candidates(url)
+    for i, candidate in enumerate(candidates):
+        last = i == len(candidates) - 1
+        try:
+            resp = _send_request(method, candidate, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            mirrors.failed(candidate)
+            if last:
+                raise
+            continue
+        if last or (resp.status_code < 500 and resp.status_code != 404):
+            return resp
+        if resp.status_code >= 500:
+            mirrors.failed(candidate)
+        resp.close()
+
+
+def _send_request(method: str, url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    started = time.perf_counter()
+    record = {"type": "request", "method": method, "url": url, "status": None}
+    try:
+        resp = get_http_session().request(method, url, **kwargs)
+        record["status"] = resp.status_code
+        return resp
+    except requests.RequestException as e:
+        record["error"] = e.__class__.__name__
+        raise
+    finally:
+        # Time to the response headers; the body is timed by the download spans
+        record["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        _record_request(record)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """GET url through the shared session."""
+    return http_request("GET", url, **kwargs)
+
+
+def http_head(url: str, **kwargs) -> requests.Response:
+    """HEAD url through the shared session."""
+    kwargs.setdefault("allow_redirects", True)
+    return http_request("HEAD", url, **kwargs)
+
+
+# Stage timings of updates and launches, one JSON object per line
+METRICS_FILE_NAME = "metrics.jsonl"
+METRICS_MAX_SIZE = 5 * 1024 * 1024
+
+_metrics_lock = threading.Lock()
+# The run in progress on each thread; worker pools carry it over with _in_metrics_run
+_metrics_local = threading.local()
+
+
+def _current_metrics_run():
+    return getattr(_metrics_local, "run", None)
+
+
+def _in_metrics_run(run, func, *args):
+    """Call func on a worker thread so its spans join run."""
+    _metrics_local.run = run
+    try:
+        return func(*args)
+    finally:
+        _metrics_local.run = None
+
+
+def _record_request(record: dict):
+    """Attach the timing of one HTTP request to the run in progress."""
+    run = _current_metrics_run()
+    if run is not None:
+        with _metrics_lock:
+            run.requests.append(record)
+    else:
+        _write_metrics([record])
+
+
+def metrics_file() -> str:
+    return os.path.join(CONFIG_DIR, METRICS_FILE_NAME)
+
+
+def _write_metrics(records: list[dict]):
+    """Append records to the metrics file, rolling it over when it is too big."""
+    path = metrics_file()
+    try:
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > METRICS_MAX_SIZE:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Could not write metrics: {e}")
+
+
+class Span:
+    """Time one stage of an update or launch.
+
+    Used as ``with stage("manifest") as span:``. Counters such as bytes and
+    retries are summed with add(), other details stored with set(), and
+    fail() marks the stage as failed without raising. An exception leaving
+    the block is recorded as the failure reason and re-raised.
+    """
+
+    def __init__(self, name: str, attrs: dict):
+        self.record = {"type": "span", "stage": name, **attrs}
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.record[key] = self.record.get(key, 0) + value
+
+    def set(self, **values):
+        self.record.update(values)
+
+    def fail(self, reason: str):
+        self.record["error"] = reason
+
+    def __enter__(self):
+        self.record["start"] = round(time.time(), 3)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+        if exc is not None:
+            self.record["error"] = f"{exc_type.__name__}: {exc}"
+        self.record["ok"] = "error" not in self.record
+        run = _current_metrics_run()
+        if run is not None:
+            with _metrics_lock:
+                run.spans.append(self.record)
+        else:
+            _write_metrics([self.record])
+        return False
+
+
+def stage(name: str, **attrs) -> Span:
+    """Return a Span for name, attached to the MetricsRun in progress."""
+    return Span(name, attrs)
+
+
+class MetricsRun:
+    """Group the spans of one update, verify pass or launch.
+
+    On exit every span and a summary line with the total time, bytes,
+    retries and per-stage durations are appended to the metrics file.
+    Runs are tracked per thread, so a background update and a launch are
+    recorded separately. Spans from download workers are collected too; runs
+    do not nest, an inner run simply joins the outer one. Every HTTP request
+    made during the run is written as a "request" line with its status and
+    time to the response headers.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.spans = []
+        self.requests = []
+        self.summary = {"type": "run", "kind": kind, "run": os.urandom(6).hex()}
+        self._outer = False
+
+    def result(self, ok: bool, message: str):
+        """Store the outcome reported to the user and return it unchanged."""
+        self.summary.update(ok=ok, message=message)
+        return ok, message
+
+    def __enter__(self):
+        if _current_metrics_run() is not None:
+            self._outer = True
+            return self
+        _metrics_local.run = self
+        self.summary["start"] = round(time.time(), 3)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._outer:
+            return False
+        _metrics_local.run = None
+        summary = self.summary
+        summary["ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+        if exc is not None:
+            summary.update(ok=False, message=f"{exc_type.__name__}: {exc}")
+        # Per-stage totals; parallel spans (downloads) can add up to more than ms
+        stages = {}
+        for span in self.spans:
+            span["run"] = summary["run"]
+            stages[span["stage"]] = round(stages.get(span["stage"], 0) + span["ms"], 1)
+        summary["stages"] = stages
+        summary["bytes"] = sum(s.get("bytes", 0) for s in self.spans)
+        summary["retries"] = sum(s.get("retries", 0) for s in self.spans)
+        summary["errors"] = [f"{s['stage']}: {s['error']}" for s in self.spans if not s["ok"]][:20]
+        summary.setdefault("ok", not summary["errors"])
+        for request in self.requests:
+            request["run"] = summary["run"]
+        times = sorted(r["ms"] for r in self.requests)
+        summary["requests"] = len(times)
+        if times:
+            summary["request_ms_median"] = times[len(times) // 2]
+            summary["request_ms_max"] = times[-1]
+        _write_metrics(self.spans + self.requests + [summary])
+        return False
+
+
+def recent_metric_runs(limit: int = 20) -> list[dict]:
+    """Return the summaries of the latest runs from the metrics file, newest first."""
+    runs = deque(maxlen=limit)
+    for path in (metrics_file() + ".1", metrics_file()):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if '"type": "run"' not in line:
+                        continue
+                    try:
+                        runs.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError:
+            continue
+    return list(reversed(runs))
+
+
+def get_latest_release_info():
+    """Return metadata about the latest client release from BUCKET_URL."""
+    return get_json_safe(f"{BUCKET_URL}/last_version.json")
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class ProgressAggregator:
+    """Byte-accurate progress for a whole update, reported at a fixed rate.
+
+    Each file of the update plan gets an item from item(), ideally with its
+    size from the manifest; sizes learned later from response headers are
+    filled in as they arrive and missing ones are estimated from the average.
+    Download code reports bytes to its item, and the aggregator turns the
+    sum into one overall percentage with throughput and ETA in the stage
+    text. progress_callback is called at most once per PROGRESS_INTERVAL no
+    matter how many threads are reporting.
+    """
+
+    def __init__(self, progress_callback, stage: str = "Скачивание"):
+        self.progress_callback = progress_callback
+        self.stage = stage
+        self._lock = threading.Lock()
+        self._done = 0
+        self._known = 0
+        self._known_items = 0
+        self._unknown_items = 0
+        self._network = 0
+        self._speed = 0.0
+        self._last_report = 0.0
+        self._percent = 0.0
+        self._speed_mark = (time.monotonic(), 0)
+
+    def item(self, size: int | None = None) -> "_ProgressItem":
+        with self._lock:
+            if size is None:
+                self._unknown_items += 1
+            else:
+                self._known += size
+                self._known_items += 1
+        return _ProgressItem(self, size)
+
+    def total(self) -> int:
+        """Return the planned size of the update, estimating unknown files."""
+        average = self._known / self._known_items if self._known_items else 1024 * 1024
+        return int(self._known + self._unknown_items * average)
+
+    def _report(self, force: bool = False):
+        # Called with self._lock held
+        now = time.monotonic()
+        if not self.progress_callback or (not force and now - self._last_report < PROGRESS_INTERVAL):
+            return
+        mark_time, mark_bytes = self._speed_mark
+        if now > mark_time:
+            current = (self._network - mark_bytes) / (now - mark_time)
+            self._speed = current if not self._speed else 0.7 * self._speed + 0.3 * current
+        self._speed_mark = (now, self._network)
+        self._last_report = now
+        total = max(self.total(), self._done, 1)
+        digits = 1 if total < 100 * 2**20 else 0
+        text = f"{self.stage} {self._done / 2**20:.{digits}f}/{total / 2**20:.{digits}f} МБ"
+        if self._speed > 1024:
+            text += f", {self._speed / 2**20:.1f} МБ/с"
+            text += f", осталось {_format_eta((total - self._done) / self._speed)}"
+        # Size estimates can grow as headers arrive; never move the bar back
+        self._percent = max(self._percent, min(100.0, self._done * 100 / total))
+        self.progress_callback(text, self._percent)
+
+    def finish(self):
+        """Send a final update regardless of the rate limit."""
+        with self._lock:
+            self._report(force=True)
+
+
+class _ProgressItem:
+    """Progress of one file inside a ProgressAggregator."""
+
+    def __init__(self, aggregator: ProgressAggregator, size: int | None):
+        self._agg = aggregator
+        self.size = size
+        self.done = 0
+
+    def start(self, size: int, done: int = 0):
+        """A transfer of size bytes begins with done bytes already present."""
+        agg = self._agg
+        with agg._lock:
+            if size and self.size is None:
+                agg._unknown_items -= 1
+                agg._known += size
+                agg._known_items += 1
+                self.size = size
+            agg._done += done - self.done
+            self.done = done
+            agg._report()
+
+    def advance(self, n: int):
+        """n more bytes arrived over the network."""
+        agg = self._agg
+        with agg._lock:
+            self.done += n
+            agg._done += n
+            agg._network += n
+            agg._report()
+
+    def complete(self, size: int | None = None):
+        """The file is in place without (further) downloading."""
+        size = size if size is not None else (self.size or self.done)
+        self.start(size, size)
+
+
+def _chunk_size_for(total: int) -> int:
+    """Pick a read size that keeps the number of chunks per file reasonable."""
+    if not total:
+        return MIN_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, total // 512))
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every download of the launcher.
+
+    take() is called for each chunk read from the network and sleeps for as
+    long as the chunks exceed the rate. Transfers register their priority
+    class with transfer(); while a more urgent transfer is running, less
+    urgent ones wait, so under a cap the files needed to start the game get
+    the whole budget. With a rate of 0 nothing ever waits.
+    """
+
+    def __init__(self, rate: float = 0):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+        self._active = [0, 0, 0]
+
+    def set_rate(self, rate: float):
+        """Change the limit in bytes per second; running downloads follow at once."""
+        with self._lock:
+            self.rate = rate
+            self._next = time.monotonic()
+
+    @contextmanager
+    def transfer(self, priority: int):
+        with self._lock:
+            self._active[priority] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[priority] -= 1
+
+    def take(self, n: int, priority: int = PRIORITY_OPTIONAL):
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    return
+                if not any(self._active[:priority]):
+                    now = time.monotonic()
+                    start = max(now, self._next)
+                    self._next = start + n / self.rate
+                    break
+            time.sleep(0.1)
+        if start > now:
+            time.sleep(start - now)
+
+
+bandwidth = BandwidthLimiter()
+
+
+def set_bandwidth_mode(playing: bool):
+    """Switch between the idle and the playing download cap."""
+    mbps = BANDWIDTH_PLAYING_MBPS if playing else BANDWIDTH_IDLE_MBPS
+    bandwidth.set_rate(mbps * 1000 * 1000 / 8)
+
+
+def download_priority(path: str) -> int:
+    """Return the priority class of a download by where it lands in the game directory."""
+    parts = os.path.relpath(os.path.abspath(path), os.path.abspath(GAME_DIR)).split(os.sep)
+    if {"versions", "libraries"} & set(parts):
+        return PRIORITY_CRITICAL
+    if "mods" in parts:
+        return PRIORITY_REQUIRED
+    return PRIORITY_OPTIONAL
+
+
+def _load_json_file(path: str) -> dict:
+    """Return the JSON object stored at path, or an empty dict."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_json_file(path: str, data: dict):
+    """Atomically write data as JSON to path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _range_total(response: requests.Response) -> int:
+    """Return the full size from a Content-Range header, or 0."""
+    match = re.search(r"/(\d+)\s*$", response.headers.get("content-range", ""))
+    return int(match.group(1)) if match else 0
+
+
+def _response_validator(response: requests.Response) -> str | None:
+    return response.headers.get("etag") or response.headers.get("last-modified")
+
+
+def _finish_part(part_path: str, state_path: str, dest_path: str, total: int) -> bool:
+    """Move a finished .part file into place if it has the expected size."""
+    if total and os.path.getsize(part_path) != total:
+        return False
+    os.replace(part_path, dest_path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return True
+
+
+def _download_segmented(asset_url: str, part_path: str, state_path: str, state: dict, progress=None,
+                        priority: int = PRIORITY_OPTIONAL) -> bool:
+    """Fill the preallocated part_path using parallel Range requests.
+
+    ``state["segments"]`` holds ``[start, end, done]`` triples and is saved
+    to state_path as data arrives, so a later call resumes every segment.
+    """
+    total = state["size"]
+    segments = state["segments"]
+    lock = threading.Lock()
+    chunk_size = _chunk_size_for(total // max(len(segments), 1))
+    saved = {"at": time.monotonic()}
+    if progress:
+        progress.start(total, sum(seg[2] for seg in segments))
+
+    def fetch(seg):
+        start, end = seg[0], seg[1]
+        if start + seg[2] > end:
+            return
+        headers = {"Range": f"bytes={start + seg[2]}-{end}"}
+        if state.get("validator"):
+            headers["If-Range"] = state["validator"]
+        with http_get(asset_url, stream=True, headers=headers) as response:
+            if response.status_code == 200:
+                # If-Range did not match: the asset changed since we started
+                state["stale"] = True
+            if response.status_code != 206:
+                raise requests.RequestException(f"range request failed: {response.status_code}")
+            with open(part_path, "r+b") as f, _mirror_stream(response):
+                f.seek(start + seg[2])
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end + 1 - start - seg[2]]
+                    bandwidth.take(len(chunk), priority)
+                    f.write(chunk)
+                    if progress:
+                        progress.advance(len(chunk))
+                    with lock:
+                        seg[2] += len(chunk)
+                        now = time.monotonic()
+                        if now - saved["at"] > 1:
+                            saved["at"] = now
+                            f.flush()
+                            _save_json_file(state_path, state)
+        if start + seg[2] <= end:
+            raise requests.RequestException("segment ended early")
+
+    pending = [seg for seg in segments if seg[0] + seg[2] <= seg[1]]
+    ok = True
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            for future in [pool.submit(fetch, seg) for seg in pending]:
+                try:
+                    future.result()
+                except (requests.RequestException, OSError):
+                    ok = False
+    if state.get("stale"):
+        os.remove(part_path)
+        os.remove(state_path)
+        return False
+    with lock:
+        _save_json_file(state_path, state)
+    return ok
+
+
+def download_asset(asset_url: str, dest_path: str, progress_callback=None, segments: int | None = None, progress=None,
+                   priority: int | None = None, on_headers=None) -> bool:
+    """Download asset_url to dest_path, resuming a previous partial download.
+
+    Data goes to ``dest_path + ".part"`` and is only renamed to dest_path once
+    complete. A leftover .part file is continued with an HTTP Range request;
+    ``If-Range`` makes the server send the whole file again if it changed.
+    Files larger than SEGMENT_MIN_SIZE are preallocated and fetched as
+    ``segments`` parallel byte ranges when the server supports it.
+
+    Bytes are reported to the ProgressAggregator item progress; a plain
+    progress_callback gets its own rate-limited aggregator. Reads go through
+    the shared bandwidth limiter in the given priority class, by default the
+    one download_priority() picks for dest_path.
+
+    on_headers(validator, size) is called once the response headers are in;
+    if it returns True it has put the file in place itself and the body is
+    not read.
+    """
+    aggregator = None
+    if progress is None and progress_callback:
+        aggregator = ProgressAggregator(progress_callback)
+        progress = aggregator.item()
+    if priority is None:
+        priority = download_priority(dest_path)
+    if not _download_asset(asset_url, dest_path, segments or DOWNLOAD_SEGMENTS, progress, priority, on_headers):
+        return False
+    if aggregator:
+        aggregator.finish()
+    return True
+
+
+def _download_asset(asset_url: str, dest_path: str, segments: int, progress, priority: int, on_headers) -> bool:
+    part_path = dest_path + ".part"
+    state_path = part_path + ".json"
+    state = _load_json_file(state_path)
+    if not os.path.exists(part_path):
+        state = {}
+
+    if state.get("segments"):
+        if not _download_segmented(asset_url, part_path, state_path, state, progress, priority):
+            return False
+        return _finish_part(part_path, state_path, dest_path, state["size"])
+
+    offset = os.path.getsize(part_path) if state else 0
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if state.get("validator"):
+            headers["If-Range"] = state["validator"]
+    with http_get(asset_url, stream=True, headers=headers) as response:
+        if response.status_code == 416 and offset:
+            # The part file may already hold the whole asset
+            total = _range_total(response)
+            if total == offset:
+                if progress:
+                    progress.complete(total)
+                return _finish_part(part_path, state_path, dest_path, total)
+            os.remove(part_path)
+            return False
+        if response.status_code == 206 and offset:
+            total = _range_total(response)
+        elif response.status_code == 200:
+            offset = 0
+            total = int(response.headers.get("content-length", 0))
+        else:
+            return False
+        if on_headers and on_headers(_response_validator(response), total or None):
+            for path in (part_path, state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            if progress:
+                progress.complete(total or None)
+            return True
+
+        state = {"size": total, "validator": _response_validator(response)}
+        ranges_ok = response.headers.get("accept-ranges", "").lower() == "bytes"
+        if offset == 0 and segments > 1 and ranges_ok and total >= SEGMENT_MIN_SIZE:
+            response.close()
+            step = -(-total // segments)
+            state["segments"] = [
+                [start, min(start + step, total) - 1, 0] for start in range(0, total, step)
+            ]
+            with open(part_path, "wb") as f:
+                f.truncate(total)
+            _save_json_file(state_path, state)
+            if not _download_segmented(asset_url, part_path, state_path, state, progress, priority):
+                return False
+            return _finish_part(part_path, state_path, dest_path, total)
+
+        _save_json_file(state_path, state)
+        if progress:
+            progress.start(total, offset)
+        downloaded = offset
+        with open(part_path, "ab" if offset else "wb") as f, _mirror_stream(response):
+            for chunk in response.iter_content(chunk_size=_chunk_size_for(total)):
+                if chunk:
+                    bandwidth.take(len(chunk), priority)
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if progress:
+                        progress.advance(len(chunk))
+    if total and downloaded != total:
+        return False
+    return _finish_part(part_path, state_path, dest_path, total)
+
+
+def _download_with_retries(url: str, dest_path: str, retries: int, progress=None, span: Span | None = None,
+                           priority: int | None = None, on_headers=None) -> str | None:
+    """Download one file, retrying on failure. Return an error or None.
+
+    Each retry resumes from whatever the previous attempt already wrote; the
+    .part file is kept after the last failure so the next update continues it.
+    Retries are counted on span.
+    """
+    if priority is None:
+        priority = download_priority(dest_path)
+    with bandwidth.transfer(priority):
+        return _retry_download(url, dest_path, retries, progress, span, priority, on_headers)
+
+
+def _retry_download(url: str, dest_path: str, retries: int, progress, span: Span | None, priority: int,
+                    on_headers=None) -> str | None:
+    error = "unknown error"
+    for attempt in range(retries):
+        if attempt:
+            if span:
+                span.add(retries=1)
+            time.sleep(min(2 ** attempt, 10))
+        try:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            if download_asset(url, dest_path, progress=progress, priority=priority, on_headers=on_headers):
+                return None
+            error = "bad response"
+        except (requests.RequestException, OSError) as e:
+            error = str(e) or e.__class__.__name__
+    return error
+
+
+def download_many(jobs, progress_callback=None, workers: int | None = None, retries: int | None = None,
+                  aggregator: ProgressAggregator | None = None):
+    """Download ``(url, dest_path[, sha256[, size]])`` jobs using a bounded pool of workers.
+
+    Jobs start in priority order (see download_priority). Every file gets up
+    to ``retries`` attempts and is checked against its sha256 when one is
+    given. Progress goes to aggregator, or to a new one
+    reporting to progress_callback. Return a list of
+    ``(dest_path, reason)`` for the files that could not be downloaded; an
+    empty list means everything is in place.
+    """
+    jobs = [tuple(job) + (None,) * (4 - len(job)) for job in jobs]
+    jobs.sort(key=lambda job: download_priority(job[1]))
+    workers = workers or DOWNLOAD_WORKERS
+    retries = retries or DOWNLOAD_RETRIES
+    failures = []
+    if not jobs:
+        return failures
+    own_aggregator = aggregator is None
+    if own_aggregator:
+        aggregator = ProgressAggregator(progress_callback)
+    items = [aggregator.item(size) for _, _, _, size in jobs]
+    run = _current_metrics_run()
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {
+            pool.submit(_in_metrics_run, run, _fetch_file, url, dest, retries, item, sha256): dest
+            for (url, dest, sha256, _), item in zip(jobs, items)
+        }
+        for future in as_completed(futures):
+            error = future.result()
+            if error:
+                failures.append((futures[future], error))
+    if own_aggregator:
+        aggregator.finish()
+    store = get_object_store()
+    if store is not None:
+        store.save()
+    return failures
+
+
+def _format_failures(failures) -> str:
+    """Return a short user-facing description of failed downloads."""
+    names = ", ".join(os.path.basename(path) for path, _ in failures[:5])
+    if len(failures) > 5:
+        names += f" и ещё {len(failures) - 5}"
+    return f"Не удалось скачать {len(failures)} файл(ов): {names}"
+
+
+# JSON metadata (release info, file lists, deltas, manifests) is kept on disk
+# with its ETag/Last-Modified so unchanged files cost a 304 and work offline
+METADATA_CACHE_NAME = "metadata"
+OFFLINE_RETRY = 60
+
+_offline_hosts = {}
+
+
+def metadata_cache_dir() -> str:
+    return os.path.join(CONFIG_DIR, METADATA_CACHE_NAME)
+
+
+def _metadata_path(url: str) -> str:
+    return os.path.join(metadata_cache_dir(), hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def fetch_json(url: str) -> tuple[object, str]:
+    """Fetch JSON from url through the metadata cache.
+
+    A cached copy is revalidated with If-None-Match/If-Modified-Since. Return
+    ``(data, source)`` where source is "network", "cache" (the server
+    confirmed the cached copy), "missing" (the server has no such file) or
+    "offline" (the server could not be reached or failed, data is the cached
+    copy or None). After a connection error the host is not asked again for
+    OFFLINE_RETRY seconds, so starting without a network does not wait for a
+    timeout per file.
+    """
+    path = _metadata_path(url)
+    cached = _load_json_file(path)
+    host = urlsplit(url).netloc
+    if _offline_hosts.get(host, 0) > time.monotonic():
+        return cached.get("data"), "offline"
+    headers = {}
+    if "data" in cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        resp = http_get(url, headers=headers)
+    except (requests.ConnectionError, requests.Timeout):
+        _offline_hosts[host] = time.monotonic() + OFFLINE_RETRY
+        return cached.get("data"), "offline"
+    except requests.RequestException:
+        return cached.get("data"), "offline"
+    _offline_hosts.pop(host, None)
+    if resp.status_code == 304 and "data" in cached:
+        return cached["data"], "cache"
+    if resp.status_code in (404, 410):
+        if cached:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return None, "missing"
+    if resp.status_code != 200:
+        return cached.get("data"), "offline"
+    try:
+        data = resp.json()
+    except ValueError:
+        return cached.get("data"), "offline"
+    try:
+        os.makedirs(metadata_cache_dir(), exist_ok=True)
+        _save_json_file(path, {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "data": data,
+        })
+    except OSError as e:
+        print(f"Could not cache {url}: {e}")
+    return data, "network"
+
+
+def get_json_safe(url: str):
+    """Fetch JSON data from url, or its cached copy when offline. Return None on error."""
+    return fetch_json(url)[0]
+
+
+def get_latest_launcher_release():
+    return get_json_safe(f"https://api.github.com/repos/{LAUNCHER_REPO}/releases/latest")
+
+
+def _run_launcher_updater(zip_url: str, latest_version: str, progress_callback=None):
+    if os.name != "nt":
+        return False  # Batch script is Windows-specific
+    exe_path = sys.executable
+    base_dir = os.path.dirname(exe_path)
+    zip_path = os.path.join(base_dir, f"launcher_update_{latest_version}.zip")
+    if not download_asset(zip_url, zip_path, progress_callback):
+        return False
+    script_path = os.path.join(base_dir, "_update_launcher.bat")
+    script = f"""
+@echo off
+:: Wait for the launcher to close
+timeout /t 2 /nobreak >nul
+:: Attempt to delete the old executable
+for /l %%i in (1,1,30) do (
+    del "{exe_path}" >nul 2>&1
+    if not exist "{exe_path}" goto :extract
+    timeout /t 1 /nobreak >nul
+)
+echo Failed to delete old executable
+exit /b 1
+:extract
+:: Extract the zip file using PowerShell
+powershell -NoProfile -ExecutionPolicy Bypass -Command "Expand-Archive -Path '{zip_path}' -DestinationPath '{base_dir}' -Force"
+if %ERRORLEVEL% neq 0 (
+    echo Failed to extract update
+    exit /b 1
+)
+:: Delete the zip file
+del "{zip_path}" >nul 2>&1
+:: Start the new launcher
+start "" "{exe_path}"
+:: Delete this script
+del "%~f0"
+    """
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(script)
+    subprocess.Popen([script_path], creationflags=subprocess.CREATE_NO_WINDOW)
+    return True
+
+
+def find_launcher_update() -> tuple[str, str] | None:
+    """Return (version, zip url) of a newer launcher release, or None."""
+    info = get_latest_launcher_release()
+    if not info:
+        return None
+    latest_version = info.get("tag_name") or info.get("name")
+    if latest_version == LAUNCHER_VERSION:
+        return None
+    for asset in info.get("assets", []):
+        name = asset.get("name", "").lower()
+        if name.endswith(".zip") and asset.get("browser_download_url"):
+            return latest_version, asset["browser_download_url"]
+    return None
+
+
+def check_for_launcher_update(progress_callback=None) -> bool:
+    """Check GitHub for a new launcher release and apply it."""
+    update = find_launcher_update()
+    if not update:
+        return False
+    latest_version, asset_url = update
+    if _run_launcher_updater(asset_url, latest_version, progress_callback):
+        print(f"Launcher updated to {latest_version}")
+        return True
+    return False
+
+
+class StreamInstallError(Exception):
+    """Raised when an archive cannot be installed while it is streaming."""
+
+
+class _ChunkReader:
+    """Byte reader over an iterator of chunks with support for pushing data back."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buf = bytearray()
+        self.consumed = 0
+
+    def _fill(self, n: int) -> bool:
+        while len(self._buf) < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return False
+            self._buf += chunk
+        return True
+
+    def read(self, n: int) -> bytes:
+        """Return exactly n bytes or raise StreamInstallError."""
+        if not self._fill(n):
+            raise StreamInstallError("unexpected end of archive")
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        self.consumed += n
+        return data
+
+    def read_some(self, n: int) -> bytes:
+        """Return up to n bytes, an empty result meaning end of stream."""
+        if not self._buf:
+            self._fill(1)
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        self.consumed += len(data)
+        return data
+
+    def unread(self, data: bytes):
+        self._buf[:0] = data
+        self.consumed -= len(data)
+
+
+def _safe_member_path(dest_dir: str, name: str) -> str:
+    """Return the extraction path for name, refusing paths outside dest_dir."""
+    try:
+        return safe_member_path(dest_dir, name)
+    except UnsafePathError as e:
+        raise StreamInstallError(str(e)) from e
+
+
+def _zip64_sizes(extra: bytes, csize: int, usize: int) -> tuple[int, int, bool]:
+    """Replace 0xFFFFFFFF sizes with the values from a ZIP64 extra field."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, pos)
+        if tag == 0x0001:
+            field = extra[pos + 4:pos + 4 + length]
+            values = list(struct.unpack_from(f"<{len(field) // 8}Q", field))
+            if usize == 0xFFFFFFFF and values:
+                usize = values.pop(0)
+            if csize == 0xFFFFFFFF and values:
+                csize = values.pop(0)
+            return csize, usize, True
+        pos += 4 + length
+    return csize, usize, False
+
+
+def _extract_stream_entry(reader: _ChunkReader, dest_dir: str, on_progress) -> str:
+    """Read one local file entry from reader, write it under dest_dir and return its name."""
+    (flags, method, crc, csize, usize, name_len, extra_len) = struct.unpack(
+        "<2xHH4xIIIHH", reader.read(26)
+    )
+    raw_name = reader.read(name_len)
+    name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+    csize, usize, zip64 = _zip64_sizes(reader.read(extra_len), csize, usize)
+    if flags & 0x1:
+        raise StreamInstallError(f"encrypted entry: {name}")
+    has_descriptor = bool(flags & 0x8)
+    if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        raise StreamInstallError(f"unsupported compression for {name}")
+    if has_descriptor and method == zipfile.ZIP_STORED:
+        raise StreamInstallError(f"cannot stream stored entry with unknown size: {name}")
+
+    target = _safe_member_path(dest_dir, name)
+    is_dir = name.endswith("/")
+    if is_dir:
+        os.makedirs(target, exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    out = None if is_dir else open(target + ".part", "wb")
+    actual_crc = 0
+    completed = False
+    try:
+        if method == zipfile.ZIP_DEFLATED:
+            inflater = zlib.decompressobj(-15)
+            remaining = None if has_descriptor else csize
+            while not inflater.eof:
+                want = STREAM_READ_SIZE if remaining is None else min(STREAM_READ_SIZE, remaining)
+                if want == 0:
+                    break
+                data = reader.read_some(want)
+                if not data:
+                    raise StreamInstallError("unexpected end of archive")
+                if remaining is not None:
+                    remaining -= len(data)
+                block = inflater.decompress(data)
+                if block:
+                    actual_crc = zlib.crc32(block, actual_crc)
+                    if out:
+                        out.write(block)
+                on_progress()
+            if inflater.unused_data:
+                reader.unread(inflater.unused_data)
+            if not inflater.eof:
+                raise StreamInstallError(f"truncated entry: {name}")
+        else:
+            remaining = csize
+            while remaining:
+                data = reader.read_some(min(STREAM_READ_SIZE, remaining))
+                if not data:
+                    raise StreamInstallError("unexpected end of archive")
+                remaining -= len(data)
+                actual_crc = zlib.crc32(data, actual_crc)
+                if out:
+                    out.write(data)
+                on_progress()
+        completed = True
+    finally:
+        if out:
+            out.close()
+            if not completed:
+                os.remove(target + ".part")
+
+    if has_descriptor:
+        head = reader.read(4)
+        if struct.unpack("<I", head)[0] == 0x08074B50:
+            head = reader.read(4)
+        crc = struct.unpack("<I", head)[0]
+        reader.read(16 if zip64 else 8)
+    if actual_crc != crc:
+        if not is_dir:
+            os.remove(target + ".part")
+        raise StreamInstallError(f"CRC mismatch: {name}")
+    if not is_dir:
+        os.replace(target + ".part", target)
+    return name
+
+
+def stream_install_zip(url: str, dest_dir: str, progress_callback=None, progress=None,
+                       part_path: str | None = None) -> list[str]:
+    """Download a zip from url and extract it into dest_dir on the fly.
+
+    Entries are written as soon as their bytes arrive: a reader thread keeps
+    pulling the response into a bounded queue while this thread inflates
+    and writes. With part_path the received bytes are also kept there in
+    download_asset's resume format, so if the stream fails a regular
+    download continues where it stopped; the file is removed once the
+    archive is installed. Progress is
+    the number of archive bytes installed, reported to the ProgressAggregator
+    item progress or to a new aggregator for progress_callback. Return the names of
+    the extracted entries; raise StreamInstallError or
+    requests.RequestException on failure.
+    """
+    with http_get(url, stream=True) as response:
+        if response.status_code != 200:
+            raise StreamInstallError(f"bad response: {response.status_code}")
+        total = int(response.headers.get("content-length", 0))
+        aggregator = None
+        if progress is None:
+            aggregator = ProgressAggregator(progress_callback, "Установка")
+            progress = aggregator.item()
+        progress.start(total)
+        chunks = queue.Queue(maxsize=64)
+        stop = threading.Event()
+        errors = []
+        keep = None
+        if part_path:
+            _save_json_file(part_path + ".json", {"size": total, "validator": _response_validator(response)})
+            keep = open(part_path, "wb")
+
+        def pump():
+            try:
+                with bandwidth.transfer(PRIORITY_CRITICAL), _mirror_stream(response):
+                    for chunk in response.iter_content(chunk_size=_chunk_size_for(total)):
+                        bandwidth.take(len(chunk), PRIORITY_CRITICAL)
+                        if keep:
+                            keep.write(chunk)
+                        while not stop.is_set():
+                            try:
+                                chunks.put(chunk, timeout=0.5)
+                                break
+                            except queue.Full:
+                                continue
+                        if stop.is_set():
+                            return
+            except Exception as e:  # surfaced to the consumer below
+                errors.append(e)
+            finally:
+                while not stop.is_set():
+                    try:
+                        chunks.put(None, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+        def iterate():
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    if errors:
+                        raise errors[0]
+                    return
+                yield chunk
+
+        reader = _ChunkReader(iterate())
+        names = []
+        state = {"reported": 0}
+
+        def on_progress():
+            progress.advance(reader.consumed - state["reported"])
+            state["reported"] = reader.consumed
+
+        pumper = threading.Thread(target=pump, daemon=True)
+        pumper.start()
+        try:
+            while True:
+                signature = reader.read_some(4)
+                if not signature:
+                    raise StreamInstallError("archive ended before its central directory")
+                if len(signature) < 4:
+                    signature += reader.read(4 - len(signature))
+                if signature == b"PK\x03\x04":
+                    names.append(_extract_stream_entry(reader, dest_dir, on_progress))
+                elif signature in (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06"):
+                    break  # central directory: every entry has been written
+                else:
+                    raise StreamInstallError("not a valid zip stream")
+        finally:
+            stop.set()
+            response.close()
+            pumper.join()
+            if keep:
+                keep.close()
+    if part_path:
+        for path in (part_path, part_path + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+    progress.complete()
+    if aggregator:
+        aggregator.finish()
+    return names
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_immutable(path: str) -> bool:
+    """Return True for files the game never rewrites, which may be hardlinked."""
+    return path.lower().endswith((".jar", ".zip"))
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """Try a copy-on-write clone of src to dst. Return True on success."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    FICLONE = 0x40049409
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+class ObjectStore:
+    """Content-addressed file store shared by every game directory.
+
+    Objects live under ``objects/<2 hex digits>/<sha256>``. ``index.json``
+    remembers which object a bucket URL served for a given ETag and size so
+    another install can link it instead of downloading it again, and
+    ``trees/`` keeps the file list of every client archive already unpacked.
+    Jars are hardlinked into game directories; files the game may edit are
+    reflinked where the filesystem supports it and copied otherwise.
+    ``stamps.json`` keeps the size and mtime each object had when its hash
+    was last checked; an object that no longer matches is hashed again
+    before it is used, since a hardlinked jar can be changed from a game
+    directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.stamps_path = os.path.join(root, "stamps.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._index = _load_json_file(self.index_path)
+        self._stamps = _load_json_file(self.stamps_path)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def has(self, digest: str | None, size: int | None = None) -> bool:
+        """Return True if object digest is present, intact and of the given size."""
+        if not digest:
+            return False
+        try:
+            st = os.stat(self.object_path(digest))
+        except OSError:
+            return False
+        if size is not None and st.st_size != size:
+            return False
+        return self._intact(digest, st)
+
+    def _intact(self, digest: str, st: os.stat_result) -> bool:
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            if self._stamps.get(digest) == stamp:
+                return True
+        path = self.object_path(digest)
+        try:
+            intact = file_sha256(path) == digest
+            if not intact:
+                print(f"Dropping damaged object {digest} from the store")
+                os.remove(path)
+        except OSError:
+            return False
+        if intact:
+            self._stamp(digest, stamp)
+        return intact
+
+    def _stamp(self, digest: str, stamp: list):
+        with self._lock:
+            self._stamps[digest] = stamp
+            self._dirty = True
+
+    def lookup(self, url: str, etag: str | None, size: int | None) -> str | None:
+        """Return the object digest last served by url, if it is unchanged."""
+        with self._lock:
+            entry = self._index.get(url)
+        if not entry or not etag or entry.get("etag") != etag or entry.get("size") != size:
+            return None
+        digest = entry.get("sha256")
+        return digest if self.has(digest, size) else None
+
+    def remember(self, url: str, etag: str | None, size: int, digest: str):
+        if not etag:
+            return
+        with self._lock:
+            self._index[url] = {"etag": etag, "size": size, "sha256": digest}
+            self._dirty = True
+
+    def add_file(self, path: str, digest: str | None = None) -> str:
+        """Put the file at path into the store and return its digest."""
+        digest = digest or file_sha256(path)
+        obj = self.object_path(digest)
+        if os.path.exists(obj):
+            return digest
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = f"{obj}.{threading.get_ident()}.tmp"
+        linked = False
+        if _is_immutable(path):
+            try:
+                os.link(path, tmp)
+                linked = True
+            except OSError:
+                pass
+        if not linked and not _reflink(path, tmp):
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, obj)
+        st = os.stat(obj)
+        self._stamp(digest, [st.st_size, st.st_mtime_ns])
+        return digest
+
+    def link_to(self, digest: str, dest: str):
+        """Materialise object digest at dest, replacing whatever is there."""
+        src = self.object_path(digest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + ".link"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        linked = False
+        if _is_immutable(dest):
+            try:
+                os.link(src, tmp)
+                linked = True
+            except OSError:
+                pass
+        if not linked and not _reflink(src, tmp):
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    @staticmethod
+    def tree_id(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def tree_path(self, tree_id: str) -> str:
+        return os.path.join(self.root, "trees", tree_id + ".json")
+
+    def load_tree(self, key: str) -> dict | None:
+        """Return ``{relative path: digest or None for directories}`` for key."""
+        try:
+            with open(self.tree_path(self.tree_id(key)), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save_tree(self, key: str, tree: dict):
+        path = self.tree_path(self.tree_id(key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _save_json_file(path, tree)
+
+    def ingest_tree(self, key: str, base_dir: str, names) -> dict:
+        """Store every extracted file under base_dir and record them as key."""
+        tree = {}
+        files = []
+        for name in names:
+            if name.endswith("/"):
+                tree[name] = None
+            else:
+                files.append(name)
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            digests = pool.map(lambda n: self.add_file(os.path.join(base_dir, n)), files)
+            tree.update(zip(files, digests))
+        self.save_tree(key, tree)
+        self.save()
+        return tree
+
+    def materialize_tree(self, tree: dict, base_dir: str) -> bool:
+        """Link every file of tree into base_dir. Return False if any object is gone."""
+        if not all(self.has(d) for d in tree.values() if d):
+            return False
+        for name, digest in tree.items():
+            target = _safe_member_path(base_dir, name)
+            if digest is None:
+                os.makedirs(target, exist_ok=True)
+            else:
+                self.link_to(digest, target)
+        self.save()
+        return True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            _save_json_file(self.index_path, self._index)
+            _save_json_file(self.stamps_path, self._stamps)
+            self._dirty = False
+
+
+_object_store = None
+
+
+def get_object_store() -> ObjectStore | None:
+    """Return the shared ObjectStore, or None when it is disabled."""
+    global _object_store
+    if not OBJECT_STORE:
+        return None
+    root = OBJECT_STORE_DIR or os.path.join(CONFIG_DIR, "store")
+    if _object_store is None or _object_store.root != root:
+        _object_store = ObjectStore(root)
+    return _object_store
+
+
+def _remote_identity(url: str) -> tuple[str | None, int | None]:
+    """Return (ETag, size) of url from a HEAD request, or (None, None)."""
+    try:
+        resp = http_head(url)
+    except requests.RequestException:
+        return None, None
+    if resp.status_code != 200:
+        return None, None
+    size = resp.headers.get("content-length")
+    return _response_validator(resp), int(size) if size is not None else None
+
+
+class _PeerRequestHandler(BaseHTTPRequestHandler):
+    """Serve objects and client trees of the local object store, read-only."""
+
+    server_version = f"EPTAPeer/{LAUNCHER_VERSION}"
+
+    def do_GET(self):
+        store = get_object_store()
+        path = None
+        if store is not None:
+            match = re.fullmatch(r"/objects/([0-9a-f]{64})", self.path)
+            if match:
+                path = store.object_path(match.group(1))
+            match = re.fullmatch(r"/trees/([0-9a-f]{40})", self.path)
+            if match:
+                path = store.tree_path(match.group(1))
+        try:
+            f = open(path, "rb") if path else None
+        except OSError:
+            f = None
+        if f is None:
+            self.send_error(404)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            try:
+                shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+            except OSError:  # the other launcher went away
+                return
+        peers.count_served(size)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _peer_message(data: bytes) -> dict:
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+class PeerCache:
+    """Share verified files with other launchers on the local network.
+
+    start() serves the object store over HTTP (``/objects/<sha256>`` and
+    ``/trees/<id>``) and answers discovery queries sent to the PEER_GROUP
+    multicast group, so launchers on one LAN, or several on one host, find
+    each other. Peers are only asked for content whose hash the launcher
+    already has from the bucket, and everything they send is hashed before
+    it is used. A peer that sends a bad file or cannot be reached is skipped
+    for MIRROR_PENALTY seconds.
+    """
+
+    def __init__(self):
+        self.node = uuid.uuid4().hex
+        self.served = 0
+        self._served_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._found = []
+        self._found_at = None
+        self._failed_until = {}
+        self._server = None
+        self._discovery = None
+
+    def count_served(self, size: int):
+        with self._served_lock:
+            self.served += size
+
+    @property
+    def port(self) -> int | None:
+        return self._server.server_address[1] if self._server is not None else None
+
+    def start(self) -> int | None:
+        """Serve the object store to peers and answer discovery. Return the TCP port."""
+        if self._server is not None or get_object_store() is None:
+            return self.port
+        try:
+            server = ThreadingHTTPServer(("", PEER_PORT), _PeerRequestHandler)
+        except OSError as e:
+            print(f"Could not start the peer cache server: {e}")
+            return None
+        server.daemon_threads = True
+        self._server = server
+        threading.Thread(target=server.serve_forever, name="peer-server", daemon=True).start()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("", PEER_DISCOVERY_PORT))
+            group = struct.pack("4s4s", socket.inet_aton(PEER_GROUP), socket.inet_aton("0.0.0.0"))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, group)
+            self._discovery = sock
+            threading.Thread(target=self._answer, args=(sock,), name="peer-discovery", daemon=True).start()
+        except OSError as e:
+            print(f"Could not join peer discovery: {e}")
+        return self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._discovery is not None:
+            self._discovery.close()
+            self._discovery = None
+
+    def _answer(self, sock: socket.socket):
+        while True:
+            try:
+                data, addr = sock.recvfrom(1024)
+            except OSError:  # closed by stop()
+                return
+            query = _peer_message(data)
+            port = self.port
+            if query.get("epta") != "peer?" or query.get("node") == self.node or port is None:
+                continue
+            try:
+                sock.sendto(json.dumps({"epta": "peer", "node": self.node, "port": port}).encode("utf-8"), addr)
+            except OSError:
+                pass
+
+    def _query(self) -> list[str]:
+        found = []
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            query = json.dumps({"epta": "peer?", "node": self.node}).encode("utf-8")
+            sock.sendto(query, (PEER_GROUP, PEER_DISCOVERY_PORT))
+            deadline = time.monotonic() + PEER_DISCOVERY_WAIT
+            while True:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                sock.settimeout(left)
+                try:
+                    data, (host, _) = sock.recvfrom(1024)
+                except socket.timeout:
+                    break
+                reply = _peer_message(data)
+                if reply.get("epta") == "peer" and reply.get("node") != self.node and isinstance(reply.get("port"), int):
+                    found.append(f"{host}:{reply['port']}")
+        finally:
+            sock.close()
+        return found
+
+    def discover(self, force: bool = False) -> list[str]:
+        """Return the "host:port" of every known peer, asking the LAN at most every PEER_REFRESH s."""
+        with self._lock:
+            if not force and self._found_at is not None and time.monotonic() - self._found_at < PEER_REFRESH:
+                return list(self._found)
+            found = list(PEER_ADDRESSES)
+            try:
+                found += self._query()
+            except OSError:  # no multicast route; only peer_addresses are used
+                pass
+            self._found = list(dict.fromkeys(found))
+            self._found_at = time.monotonic()
+            return list(self._found)
+
+    def ranked(self) -> list[str]:
+        """Return the peers worth asking, or nothing when the peer cache is off."""
+        if not PEER_CACHE:
+            return []
+        now = time.monotonic()
+        return [peer for peer in self.discover() if self._failed_until.get(peer, 0) <= now]
+
+    def failed(self, peer: str):
+        with self._lock:
+            self._failed_until[peer] = time.monotonic() + MIRROR_PENALTY
+
+    def fetch(self, digest: str, dest_path: str, progress=None, span: Span | None = None) -> str | None:
+        """Download object digest to dest_path from the first peer with an intact copy.
+
+        Return the peer it came from, or None if no peer could supply it.
+        Copies rejected for a wrong hash are counted on span.
+        """
+        tmp = dest_path + ".peer"
+        for peer in self.ranked():
+            hasher = hashlib.sha256()
+            total = 0
+            try:
+                with _send_request("GET", f"http://{peer}/objects/{digest}", stream=True,
+                                   timeout=(PEER_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)) as resp:
+                    if resp.status_code != 200:
+                        continue
+                    total = int(resp.headers.get("content-length") or 0)
+                    if progress:
+                        progress.start(total)
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    with open(tmp, "wb") as f:
+                        for chunk in resp.iter_content(chunk_size=_chunk_size_for(total)):
+                            f.write(chunk)
+                            hasher.update(chunk)
+                            if progress:
+                                progress.advance(len(chunk))
+                if hasher.hexdigest() == digest:
+                    os.replace(tmp, dest_path)
+                    return peer
+                if span:
+                    span.add(peer_rejected=1)
+            except (requests.RequestException, OSError, ValueError):
+                pass
+            self.failed(peer)
+            if progress:
+                progress.start(total, 0)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return None
+
+    def fetch_tree(self, key: str) -> dict | None:
+        """Return a peer's file list of the client archive identified by key."""
+        for peer in self.ranked():
+            try:
+                resp = _send_request("GET", f"http://{peer}/trees/{ObjectStore.tree_id(key)}",
+                                     timeout=(PEER_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+                if resp.status_code != 200:
+                    continue
+                tree = resp.json()
+            except (requests.RequestException, ValueError):
+                self.failed(peer)
+                continue
+            if isinstance(tree, dict):
+                return tree
+        return None
+
+
+peers = PeerCache()
+
+
+def _fetch_file(url: str, dest_path: str, retries: int, progress=None, sha256: str | None = None) -> str | None:
+    """Place url at dest_path, linking from the object store when possible.
+
+    With a known sha256 the store is consulted without asking the server,
+    LAN peers are tried before url, and the downloaded file is rejected if
+    its hash does not match.
+    """
+    with stage("download", file=os.path.basename(dest_path)) as span:
+        error = _fetch_file_into(url, dest_path, retries, progress, sha256, span)
+        if error:
+            span.fail(error)
+        return error
+
+
+def _fetch_file_into(url: str, dest_path: str, retries: int, progress, sha256: str | None, span: Span) -> str | None:
+    store = get_object_store()
+    if store is None and not sha256:
+        span.set(source="network")
+        error = _download_with_retries(url, dest_path, retries, progress, span)
+        if error is None:
+            span.add(bytes=os.path.getsize(dest_path))
+        return error
+    digest = sha256 if store is not None and store.has(sha256) else None
+    if digest:
+        try:
+            store.link_to(digest, dest_path)
+            if progress:
+                progress.complete(os.path.getsize(dest_path))
+            span.set(source="store")
+            return None
+        except OSError:
+            pass
+    if sha256:
+        peer = peers.fetch(sha256, dest_path, progress, span)
+        if peer:
+            span.set(source="peer", peer=peer)
+            span.add(bytes=os.path.getsize(dest_path))
+            if store is not None:
+                try:
+                    store.add_file(dest_path, sha256)
+                except OSError as e:
+                    print(f"Could not add {dest_path} to the object store: {e}")
+            return None
+    identity = {}
+
+    def link_known(etag, size):
+        # Without a hash the GET's own headers tell whether the store has the file
+        identity.update(etag=etag, size=size)
+        known = store.lookup(url, etag, size) if store is not None and not sha256 else None
+        if not known:
+            return False
+        try:
+            store.link_to(known, dest_path)
+        except OSError:
+            return False
+        identity["linked"] = True
+        return True
+
+    span.set(source="network")
+    error = _download_with_retries(url, dest_path, retries, progress, span, on_headers=link_known)
+    if error is not None:
+        return error
+    if identity.get("linked"):
+        if progress:
+            progress.complete(os.path.getsize(dest_path))
+        span.set(source="store")
+        return None
+    span.add(bytes=os.path.getsize(dest_path))
+    try:
+        digest = file_sha256(dest_path)
+        if sha256 and digest != sha256:
+            os.remove(dest_path)
+            return "hash mismatch"
+        if store is not None:
+            store.remember(url, identity.get("etag"), os.path.getsize(dest_path), store.add_file(dest_path, digest))
+    except OSError as e:
+        print(f"Could not add {dest_path} to the object store: {e}")
+    return None
+
+
+def _plan_downloads(remote_dir: str, local_dir: str, names, manifest: dict | None = None) -> list[tuple]:
+    """Return download jobs for names stored under BUCKET_URL/remote_dir.
+
+    Files listed in manifest get their expected sha256 and size attached.
+    """
+    os.makedirs(local_dir, exist_ok=True)
+    prefix = os.path.basename(local_dir)
+    jobs = []
+    for name in names:
+        entry = (manifest or {}).get(f"{prefix}/{name}") or {}
+        sha256 = entry.get("sha256") if not entry.get("mutable") else None
+        jobs.append((f"{BUCKET_URL}/{remote_dir}/{name}", os.path.join(local_dir, name), sha256, entry.get("size")))
+    return jobs
+
+
+def _apply_patch(local_dir: str, patch: dict, expected: str | None, tmp_dir: str, base_dir: str | None = None) -> bool:
+    """Build local_dir/patch["to"] from patch["from"] with a bsdiff patch.
+
+    The old file is read from base_dir when given. The result must hash to
+    expected before it replaces anything.
+    """
+    old_path = os.path.join(base_dir or local_dir, patch["from"])
+    new_path = os.path.join(local_dir, patch["to"])
+    if not expected or not os.path.exists(old_path):
+        return False
+    try:
+        if patch.get("from_sha256") and file_sha256(old_path) != patch["from_sha256"]:
+            return False
+    except OSError:
+        # The file is downloaded in full instead
+        return False
+    name = hashlib.sha1(patch["patch"].encode("utf-8")).hexdigest()
+    patch_path = os.path.join(tmp_dir, name + ".patch")
+    out_path = os.path.join(tmp_dir, name + ".out")
+    if _download_with_retries(f"{BUCKET_URL}/{patch['patch']}", patch_path, DOWNLOAD_RETRIES, priority=download_priority(new_path)):
+        return False
+    try:
+        bsdiff4.file_patch(old_path, out_path, patch_path)
+        digest = file_sha256(out_path)
+        if digest != expected:
+            print(f"Patched {patch['to']} has the wrong hash, downloading it instead")
+            return False
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(out_path, new_path)
+    except Exception as e:  # a malformed patch must never break the update
+        print(f"Could not apply patch for {patch['to']}: {e}")
+        return False
+    finally:
+        for path in (patch_path, out_path):
+            if os.path.exists(path):
+                os.remove(path)
+    store = get_object_store()
+    if store is not None:
+        try:
+            store.add_file(new_path, digest)
+        except OSError:
+            pass
+    return True
+
+
+def apply_patches(local_dir: str, patches, manifest: dict | None = None, base_dir: str | None = None) -> set[str]:
+    """Apply the binary patches listed in a version delta.
+
+    Each patch is ``{"from": "old.jar", "to": "new.jar", "patch":
+    "<path relative to BUCKET_URL>", "sha256": "<hash of new.jar>"}``; the
+    hash may also come from manifest. Patches run in parallel and must be
+    applied before the delta's "del" list removes the old files. Return the
+    names in local_dir that were produced, so they can be skipped from the
+    full downloads. The old files are taken from base_dir if it is given, so
+    a staged update can be built without touching the live directory.
+    Without the optional bsdiff4 module nothing is patched.
+    """
+    patches = [p for p in patches or [] if isinstance(p, dict) and p.get("from") and p.get("to") and p.get("patch")]
+    if bsdiff4 is None or not patches:
+        return set()
+    prefix = os.path.basename(local_dir)
+    tmp_dir = tempfile.mkdtemp(prefix="epta_patch_")
+    done = set()
+    try:
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(patches))) as pool:
+            futures = {}
+            for patch in patches:
+                expected = patch.get("sha256") or ((manifest or {}).get(f"{prefix}/{patch['to']}") or {}).get("sha256")
+                futures[pool.submit(_apply_patch, local_dir, patch, expected, tmp_dir, base_dir)] = patch["to"]
+            for future in as_completed(futures):
+                if future.result():
+                    done.add(futures[future])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return done
+
+
+def get_manifest(version: str | None) -> dict | None:
+    """Return the file manifest of a client version keyed by relative path.
+
+    ``BUCKET_URL/<version>/manifest.json`` holds ``{"files": [...]}`` where
+    each entry is ``{"path": "mods/foo.jar", "size": 123, "sha256": "..."}``.
+    An optional "url" (relative to BUCKET_URL) says where to fetch the file
+    from, and ``"mutable": true`` marks files such as configs that the game
+    rewrites, which are only checked for presence.
+    """
+    return fetch_manifest(version)[0]
+
+
+def fetch_manifest(version: str | None) -> tuple[dict | None, str]:
+    """Return ``(manifest, source)`` like get_manifest, with the fetch_json source."""
+    if not version:
+        return None, "missing"
+    data, source = fetch_json(f"{BUCKET_URL}/{version}/manifest.json")
+    if not isinstance(data, dict):
+        return None, source
+    return {
+        entry["path"].replace("\\", "/"): entry
+        for entry in data.get("files") or []
+        if isinstance(entry, dict) and entry.get("path")
+    }, source
+
+
+def _manifest_file_url(entry: dict) -> str:
+    """Return where a manifest entry can be downloaded from."""
+    if entry.get("url"):
+        return f"{BUCKET_URL}/{entry['url']}"
+    if entry["path"].split("/", 1)[0] in ("mods", "config", "kubejs"):
+        return f"{BUCKET_URL}/{entry['path']}"
+    # Files unpacked from eptaclientbase.zip are mirrored next to it
+    return f"{BUCKET_URL}/EPTAClient/{entry['path']}"
+
+
+def _integrity_index_path(game_dir: str) -> str:
+    key = hashlib.sha1(os.path.abspath(game_dir).encode("utf-8")).hexdigest()
+    return os.path.join(CONFIG_DIR, "integrity", f"{key}.json")
+
+
+def _load_integrity_index(game_dir: str) -> dict:
+    """Return ``{relative path: [size, mtime_ns, sha256]}`` for game_dir."""
+    return _load_json_file(_integrity_index_path(game_dir))
+
+
+def _save_integrity_index(game_dir: str, index: dict):
+    path = _integrity_index_path(game_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _save_json_file(path, index)
+
+
+def verify_installation(game_dir: str, manifest: dict, progress_callback=None) -> list[dict]:
+    """Return the manifest entries that are missing or damaged in game_dir.
+
+    Hashes are cached together with each file's size and mtime, so only files
+    that changed since the last pass are read again. Hashing runs on
+    VERIFY_WORKERS threads; hashlib releases the GIL so they use every core.
+    Progress is reported by bytes checked, at most once per PROGRESS_INTERVAL.
+    """
+    index = _load_integrity_index(game_dir)
+    entries = list(manifest.values())
+    aggregator = ProgressAggregator(progress_callback, "Проверка")
+    items = [aggregator.item(entry.get("size")) for entry in entries]
+
+    def check(entry):
+        path = entry["path"]
+        try:
+            st = os.stat(os.path.join(game_dir, *path.split("/")))
+        except OSError:
+            return entry, False, None
+        if entry.get("mutable"):
+            return entry, True, None
+        if entry.get("size") is not None and st.st_size != entry["size"]:
+            return entry, False, None
+        cached = index.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            digest = cached[2]
+        else:
+            digest = file_sha256(os.path.join(game_dir, *path.split("/")))
+        return entry, digest == entry.get("sha256"), [st.st_size, st.st_mtime_ns, digest]
+
+    bad = []
+    with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as pool:
+        for item, (entry, ok, record) in zip(items, pool.map(check, entries)):
+            if record:
+                index[entry["path"]] = record
+            if not ok:
+                bad.append(entry)
+            item.complete(record[0] if record else None)
+    aggregator.finish()
+    _save_integrity_index(game_dir, index)
+    return bad
+
+
+def repair_installation(game_dir: str, entries, progress_callback=None):
+    """Fetch the given manifest entries again. Return download failures."""
+    jobs = []
+    for entry in entries:
+        sha256 = entry.get("sha256") if not entry.get("mutable") else None
+        path = os.path.join(game_dir, *entry["path"].split("/"))
+        jobs.append((_manifest_file_url(entry), path, sha256, entry.get("size")))
+    return download_many(jobs, progress_callback)
+
+
+def verify_game(repair: bool = False, progress_callback=None):
+    """Check GAME_DIR against the manifest of LAST_VERSION, optionally fixing it."""
+    with MetricsRun("verify") as run:
+        return run.result(*_verify_game(repair, progress_callback))
+
+
+def _verify_game(repair: bool, progress_callback):
+    if LAST_VERSION is None:
+        return False, "Клиент не установлен"
+    with stage("manifest", version=LAST_VERSION) as span:
+        manifest = get_manifest(LAST_VERSION)
+        if manifest is None:
+            span.fail("no manifest")
+            return False, "Не удалось получить список файлов версии"
+    with stage("verify", files=len(manifest)) as span:
+        bad = verify_installation(GAME_DIR, manifest, progress_callback)
+        span.set(bad=len(bad))
+    if not bad:
+        result = True, "Все файлы в порядке!"
+    elif not repair:
+        result = False, f"Повреждённых или отсутствующих файлов: {len(bad)}"
+    else:
+        with stage("repair", files=len(bad)) as span:
+            failures = repair_installation(GAME_DIR, bad, progress_callback)
+            if failures:
+                span.fail(_format_failures(failures))
+        if failures:
+            result = False, _format_failures(failures)
+        else:
+            result = True, f"Восстановлено файлов: {len(bad)}"
+    if progress_callback:
+        progress_callback("Готово", 100)
+    return result
+
+
+def _finish_with_manifest(manifest: dict | None, progress_callback=None) -> str | None:
+    """Verify a fresh install against its manifest and repair what is off.
+
+    Return an error message, or None when the installation is complete.
+    """
+    if not manifest:
+        return None
+    with stage("verify", files=len(manifest)) as span:
+        bad = verify_installation(GAME_DIR, manifest, progress_callback)
+        span.set(bad=len(bad))
+    if not bad:
+        return None
+    with stage("repair", files=len(bad)) as span:
+        failures = repair_installation(GAME_DIR, bad, progress_callback)
+        if failures:
+            span.fail(_format_failures(failures))
+    return _format_failures(failures) if failures else None
+
+
+# Partial updates are downloaded next to the live files and swapped in by
+# renaming whole directories, so the game never sees a half-updated install.
+STAGING_DIR_NAME = ".staging"
+ROLLBACK_DIR_NAME = ".rollback"
+BACKGROUND_STAGING = True
+STAGING_INTERVAL = 30 * 60
+
+_staging_lock = threading.Lock()
+
+
+def _staging_root(game_dir: str) -> str:
+    return os.path.join(game_dir, STAGING_DIR_NAME)
+
+
+def _rollback_root(game_dir: str) -> str:
+    return os.path.join(game_dir, ROLLBACK_DIR_NAME)
+
+
+def staged_update(game_dir: str | None = None) -> dict | None:
+    """Return the description of the completely staged update, if any."""
+    state = _load_json_file(os.path.join(_staging_root(game_dir or GAME_DIR), "staged.json"))
+    return state if state.get("complete") and state.get("version") else None
+
+
+def stage_update(version: str, manifest: dict | None, progress_callback=None) -> str | None:
+    """Prepare the update from LAST_VERSION to version in GAME_DIR/.staging.
+
+    Patched and added files are written to .staging/<version>/<dir>; files
+    the delta deletes are only recorded. The live mods/, config/ and kubejs/
+    directories are not touched, so this is safe while the game is running.
+    An interrupted staging is resumed. Return an error message or None.
+    """
+    with _staging_lock:
+        root = _staging_root(GAME_DIR)
+        state_path = os.path.join(root, "staged.json")
+        state = _load_json_file(state_path)
+        if state.get("version") == version and state.get("from") == LAST_VERSION:
+            if state.get("complete"):
+                return None
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+        staged_root = os.path.join(root, version)
+        state = {"version": version, "from": LAST_VERSION, "dirs": {}, "complete": False}
+        os.makedirs(root, exist_ok=True)
+        _save_json_file(state_path, state)
+
+        jobs = []
+        for remote, delta_dir in (("mods", "mods"), ("config", "configs"), ("kubejs", "kubejs")):
+            with stage("delta", dir=remote) as span:
+                delta, source = fetch_json(f"{BUCKET_URL}/{version}/{delta_dir}/{LAST_VERSION}.json")
+                span.set(source=source)
+                if source == "offline":
+                    # Skipping the dir would leave its old files next to the new version
+                    span.fail("offline")
+                    return f"Не удалось получить список изменений {remote} для {version}"
+            if not delta:
+                continue
+            staged_dir = os.path.join(staged_root, remote)
+            os.makedirs(staged_dir, exist_ok=True)
+            with stage("patches", dir=remote) as span:
+                patched = apply_patches(staged_dir, delta.get("patch"), manifest, os.path.join(GAME_DIR, remote))
+                span.set(applied=len(patched))
+            added = [name for name in delta.get("add") or [] if name not in patched]
+            jobs += _plan_downloads(remote, staged_dir, added, manifest)
+            state["dirs"][remote] = {"delete": [name for name in delta.get("del") or [] if name not in patched]}
+
+        with stage("downloads", files=len(jobs)) as span:
+            failures = download_many(jobs, progress_callback)
+            if failures:
+                span.fail(_format_failures(failures))
+                return _format_failures(failures)
+        state["complete"] = True
+        _save_json_file(state_path, state)
+        return None
+
+
+def _fill_staged_dir(live_dir: str, staged_dir: str, delete: set[str]):
+    """Link every live file the update keeps into staged_dir.
+
+    Jars are hardlinked, other files reflinked or copied so that editing a
+    config after the update does not change the copy kept for rollback.
+    """
+    os.makedirs(staged_dir, exist_ok=True)
+    if not os.path.isdir(live_dir):
+        return
+    for folder, _, files in os.walk(live_dir):
+        for name in files:
+            src = os.path.join(folder, name)
+            rel = os.path.relpath(src, live_dir).replace(os.sep, "/")
+            dst = os.path.join(staged_dir, rel)
+            if rel in delete or os.path.exists(dst):
+                continue
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if _is_immutable(src):
+                try:
+                    os.link(src, dst)
+                    continue
+                except OSError:
+                    pass
+            if not _reflink(src, dst):
+                shutil.copy2(src, dst)
+
+
+def _journal_path() -> str:
+    return os.path.join(_staging_root(GAME_DIR), "swap.json")
+
+
+def _undo_moves(moves):
+    for src, dst in reversed(moves):
+        if os.path.exists(dst) and not os.path.exists(src):
+            os.replace(dst, src)
+
+
+def _swap_dirs(moves, version: str):
+    """Rename directories as listed in moves, then record version as installed.
+
+    The moves are journaled first together with version; if anything fails,
+    or the launcher dies before the config records version, the renames are
+    undone (see recover_update_swap) and the old version stays in place.
+    """
+    journal = _journal_path()
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    _save_json_file(journal, {"moves": moves, "version": version})
+    try:
+        for src, dst in moves:
+            if os.path.exists(src):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                os.replace(src, dst)
+        _save_installed_version(version)
+    except BaseException:
+        _undo_moves(moves)
+        os.remove(journal)
+        raise
+    os.remove(journal)
+
+
+def recover_update_swap():
+    """Undo a directory swap that was interrupted, e.g. by a crash.
+
+    A swap whose version already made it into the config was complete and
+    only lost its journal, so it is kept.
+    """
+    state = _load_json_file(_journal_path())
+    if not state:
+        return
+    if state.get("version") and state["version"] == LAST_VERSION:
+        try:
+            os.remove(_journal_path())
+        except OSError as e:
+            print(f"Could not remove the update swap journal: {e}")
+        return
+    print("Undoing an interrupted update swap")
+    try:
+        _undo_moves([tuple(move) for move in state.get("moves") or []])
+        os.remove(_journal_path())
+    except OSError as e:
+        print(f"Could not undo the update swap: {e}")
+
+
+def apply_staged_update(blocking: bool = True) -> str | None:
+    """Swap the staged update into GAME_DIR. Return the installed version or None.
+
+    The staged directories are completed with links to the unchanged files,
+    then the live directories are moved to .rollback/<old version> and the
+    staged ones take their place. Only the latest previous version is kept.
+    The game must not be running. Without blocking nothing happens while an
+    update is still being staged.
+    """
+    if not _staging_lock.acquire(blocking):
+        return None
+    try:
+        recover_update_swap()
+        state = staged_update()
+        if state is None:
+            return None
+        root = _staging_root(GAME_DIR)
+        if state.get("from") != LAST_VERSION:
+            # Staged for an installation that has changed since
+            shutil.rmtree(root, ignore_errors=True)
+            return None
+        version = state["version"]
+        staged_root = os.path.join(root, version)
+        with stage("apply_staged", version=version):
+            if not state.get("full"):
+                for name, info in state["dirs"].items():
+                    _fill_staged_dir(os.path.join(GAME_DIR, name), os.path.join(staged_root, name), set(info.get("delete") or []))
+            previous = LAST_VERSION or "unknown"
+            rollback_root = _rollback_root(GAME_DIR)
+            shutil.rmtree(rollback_root, ignore_errors=True)
+            backup = os.path.join(rollback_root, previous)
+            os.makedirs(backup)
+            moves = []
+            for name in state["dirs"]:
+                moves.append((os.path.join(GAME_DIR, name), os.path.join(backup, name)))
+                moves.append((os.path.join(staged_root, name), os.path.join(GAME_DIR, name)))
+            _swap_dirs(moves, version)
+            _save_json_file(os.path.join(rollback_root, "rollback.json"),
+                            {"version": previous, "replaced_by": version, "dirs": list(state["dirs"])})
+            shutil.rmtree(root, ignore_errors=True)
+        return version
+    finally:
+        _staging_lock.release()
+
+
+def rollback_update() -> tuple[bool, str]:
+    """Go back to the version kept in .rollback by the last applied update.
+
+    The current directories are staged again, so the newer version can be
+    reinstalled without downloading it.
+    """
+    with _staging_lock:
+        recover_update_swap()
+        rollback_root = _rollback_root(GAME_DIR)
+        info = _load_json_file(os.path.join(rollback_root, "rollback.json"))
+        if not info or info.get("replaced_by") != LAST_VERSION:
+            return False, "Нет предыдущей версии для отката"
+        previous, current = info["version"], LAST_VERSION
+        root = _staging_root(GAME_DIR)
+        shutil.rmtree(root, ignore_errors=True)
+        staged_root = os.path.join(root, current)
+        moves = []
+        for name in info.get("dirs") or []:
+            moves.append((os.path.join(GAME_DIR, name), os.path.join(staged_root, name)))
+            moves.append((os.path.join(rollback_root, previous, name), os.path.join(GAME_DIR, name)))
+        with stage("rollback", version=previous):
+            _swap_dirs(moves, previous)
+            os.makedirs(root, exist_ok=True)
+            _save_json_file(os.path.join(root, "staged.json"), {
+                "version": current, "from": previous, "full": True, "complete": True,
+                "dirs": {name: {"delete": []} for name in info.get("dirs") or []},
+            })
+            shutil.rmtree(rollback_root, ignore_errors=True)
+        return True, f"Восстановлена версия {previous}"
+
+
+def prestage_update() -> str | None:
+    """Stage the next client version in the background, also while playing.
+
+    Does nothing if an update is already being staged or the client is not
+    installed. Return the staged version or None.
+    """
+    if not BACKGROUND_STAGING or LAST_VERSION is None or _staging_lock.locked():
+        return None
+    with MetricsRun("prestage") as run:
+        info, source = fetch_json(f"{BUCKET_URL}/last_version.json")
+        if source == "offline":
+            run.result(False, "offline")
+            return None
+        latest = (info or {}).get("last")
+        if not latest or latest == LAST_VERSION or LAST_VERSION in info.get("unsupported", []):
+            run.result(True, "nothing to stage")
+            return None
+        manifest, source = fetch_manifest(latest)
+        if source == "offline":
+            run.result(False, "offline")
+            return None
+        error = stage_update(latest, manifest)
+        run.result(error is None, error or f"staged {latest}")
+    return None if error else latest
+
+
+def _install_tree_from_peers(tree_key: str, manifest: dict, aggregator: ProgressAggregator, span: Span) -> bool:
+    """Install the client archive identified by tree_key file by file from LAN peers.
+
+    Only the file list is taken from the peer. Files the manifest lists with
+    a hash are fetched from peers and checked against it; the rest comes
+    from EPTAClient/<path> in the bucket. Return False, leaving whatever was
+    written for the archive install to overwrite, if no peer has the tree,
+    too little of it can be checked or a file cannot be fetched.
+    """
+    store = get_object_store()
+    tree = peers.fetch_tree(tree_key)
+    if store is None or not tree:
+        return False
+    dirs = []
+    jobs = []
+    unchecked = 0
+    try:
+        for name, digest in tree.items():
+            target = safe_member_path(GAME_DIR, name)
+            if digest is None:
+                dirs.append(target)
+                continue
+            entry = manifest.get(name) or {}
+            sha256 = entry.get("sha256") if not entry.get("mutable") else None
+            unchecked += not sha256
+            jobs.append((f"{BUCKET_URL}/EPTAClient/{name}", target, sha256, entry.get("size"), name))
+    except UnsafePathError as e:
+        span.fail(f"unsafe file list: {e}")
+        return False
+    # Fetching many unlisted files one by one is slower than the archive
+    if not jobs or unchecked * 10 > len(jobs):
+        return False
+    for path in dirs:
+        os.makedirs(path, exist_ok=True)
+    failures = download_many([job[:4] for job in jobs], aggregator=aggregator)
+    if failures:
+        span.fail(_format_failures(failures))
+        return False
+    installed = {name: None for name, digest in tree.items() if digest is None}
+    for _, target, sha256, _, name in jobs:
+        installed[name] = sha256 or store.add_file(target)
+    store.save_tree(tree_key, installed)
+    return True
+
+
+# Returned by check_for_update when there is nothing to install
+UP_TO_DATE_MESSAGE = "У Вас последняя версия!"
+
+
+def check_for_update(progress_callback=None):
+    """Check the bucket for a new client release and install it.
+
+    Every stage is timed into the metrics file, see MetricsRun.
+    """
+    with MetricsRun("update") as run:
+        return run.result(*_check_for_update(progress_callback))
+
+
+def _save_installed_version(version: str):
+    """Record version as installed in GAME_DIR without touching other settings."""
+    global LAST_VERSION
+    with stage("save_config"):
+        LAST_VERSION = version
+        key = os.path.abspath(GAME_DIR)
+        if key == os.path.abspath(configured_game_dir()):
+            update_config_values({"last_version": version})
+        else:
+            INSTALLED_VERSIONS[key] = version
+            update_config_values({"installed_versions": INSTALLED_VERSIONS})
+
+
+def _check_for_update(progress_callback):
+    with stage("release_info") as span:
+        info, source = fetch_json(f"{BUCKET_URL}/last_version.json")
+        span.set(source=source)
+        if source == "offline":
+            span.fail("offline")
+            if LAST_VERSION:
+                return False, f"Нет связи с сервером обновлений, установлена версия {LAST_VERSION}"
+            return False, "Нет связи с сервером обновлений"
+        if not info:
+            span.fail("no release info")
+            return False, "Ошибка в поиске последней версии"
+
+    latest_version = info.get("last")
+    unsupported = info.get("unsupported", [])
+
+    jar_path = os.path.join(
+        GAME_DIR, "versions", "Forge-1.20.1", "Forge-1.20.1.jar"
+    )
+
+    full_install = LAST_VERSION is None or not os.path.exists(jar_path)
+    if not full_install:
+        if LAST_VERSION == latest_version:
+            return False, UP_TO_DATE_MESSAGE
+        if LAST_VERSION in unsupported:
+            return False, "Ваша версия не поддерживается, переустановите клиент"
+
+    # Installing from a stale or missing file list would leave files out
+    with stage("manifest", version=latest_version) as span:
+        manifest, source = fetch_manifest(latest_version)
+        span.set(files=len(manifest or {}), source=source)
+        if source == "offline":
+            span.fail("offline")
+            return False, "Нет связи с сервером обновлений"
+
+    if full_install:
+        # Full install: plan every file first so progress covers the whole update
+        base_url = f"{BUCKET_URL}/EPTAClient/eptaclientbase.zip"
+        os.makedirs(GAME_DIR, exist_ok=True)
+        zip_path = os.path.join(GAME_DIR, "eptaclientbase.zip")
+        jobs = []
+        with stage("plan") as span:
+            for remote, local, index in (
+                ("mods", "mods", "mods/mods.json"),
+                ("config", "config", "config/configs.json"),
+                ("kubejs", "kubejs", "kubejs/kubejs.json"),
+            ):
+                info, source = fetch_json(f"{BUCKET_URL}/{index}")
+                if source == "offline":
+                    span.fail(f"{index}: offline")
+                    return False, "Нет связи с сервером обновлений"
+                if info:
+                    jobs += _plan_downloads(remote, os.path.join(GAME_DIR, local), info.get("add") or [], manifest)
+            span.set(files=len(jobs))
+
+        aggregator = ProgressAggregator(progress_callback)
+        base_item = aggregator.item()
+        store = get_object_store()
+        tree_key = None
+        installed = False
+        size = None
+        if store is not None:
+            with stage("store_link") as span:
+                etag, size = _remote_identity(base_url)
+                if etag:
+                    tree_key = f"{base_url}|{etag}|{size}"
+                    tree = store.load_tree(tree_key)
+                    if tree:
+                        try:
+                            installed = store.materialize_tree(tree, GAME_DIR)
+                        except OSError as e:
+                            print(f"Could not link client from the object store: {e}")
+                span.set(hit=installed)
+        if installed:
+            base_item.complete(size or 0)
+        elif tree_key and manifest and PEER_CACHE:
+            with stage("peer_install") as span:
+                try:
+                    installed = _install_tree_from_peers(tree_key, manifest, aggregator, span)
+                except OSError as e:
+                    span.fail(str(e))
+                span.set(hit=installed)
+            if installed:
+                base_item.complete(0)
+        names = None
+        # A leftover .part means a resumable download is already under way
+        if not installed and STREAM_INSTALL and not os.path.exists(zip_path + ".part"):
+            with stage("stream_install") as span:
+                try:
+                    names = stream_install_zip(base_url, GAME_DIR, progress=base_item, part_path=zip_path + ".part")
+                    installed = True
+                    span.add(bytes=base_item.done)
+                except (StreamInstallError, requests.RequestException, OSError) as e:
+                    span.fail(str(e))
+                    print(f"Streaming install failed, downloading archive instead: {e}")
+        if not installed:
+            with stage("base_download") as span:
+                error = _download_with_retries(base_url, zip_path, DOWNLOAD_RETRIES, base_item, span, PRIORITY_CRITICAL)
+                if error:
+                    span.fail(error)
+                    return False, "Ошибка при скачивании клиента"
+                span.add(bytes=os.path.getsize(zip_path))
+            with stage("extract") as span:
+                unpacked = ProgressAggregator(progress_callback, "Распаковка")
+                try:
+                    names = extract_zip(zip_path, GAME_DIR, workers=EXTRACT_WORKERS, progress=unpacked.item())
+                except (zipfile.BadZipFile, UnsafePathError) as e:
+                    span.fail(str(e))
+                    os.remove(zip_path)
+                    return False, "Скачанный файл не валидный zip-архив"
+                unpacked.finish()
+                span.set(files=len(names))
+                os.remove(zip_path)
+        if store is not None and tree_key and names is not None:
+            with stage("store_ingest") as span:
+                try:
+                    store.ingest_tree(tree_key, GAME_DIR, names)
+                except OSError as e:
+                    span.fail(str(e))
+                    print(f"Could not add client files to the object store: {e}")
+
+        with stage("downloads", files=len(jobs)) as span:
+            failures = download_many(jobs, aggregator=aggregator)
+            aggregator.finish()
+            if failures:
+                span.fail(_format_failures(failures))
+                return False, _format_failures(failures)
+        error = _finish_with_manifest(manifest, progress_callback)
+        if error:
+            return False, error
+
+        _save_installed_version(latest_version)
+        if progress_callback:
+            progress_callback("Готово", 100)
+        return True, f"Установлено {latest_version}!"
+
+    # Partial update: staged next to the live files, then swapped in
+    error = stage_update(latest_version, manifest, progress_callback)
+    if error:
+        return False, error
+    if game_running():
+        if AUTO_UPDATE:
+            return True, f"Обновление {latest_version} загружено и будет установлено при следующем запуске"
+        # Without auto update a launch keeps the installed version
+        return True, (f"Обновление {latest_version} загружено. Закройте игру и нажмите "
+                      "«Проверить обновления», чтобы установить его")
+    try:
+        apply_staged_update()
+    except OSError as e:
+        return False, f"Не удалось установить обновление: {e}"
+    if LAST_VERSION != latest_version:
+        return False, "Не удалось установить обновление, попробуйте ещё раз"
+    error = _finish_with_manifest(manifest, progress_callback)
+    if error:
+        return False, error
+
+    if progress_callback:
+        progress_callback("Готово", 100)
+    return True, f"Обновлено до {latest_version}!"
+
+
+# Output lines marking startup milestones of a Forge 1.20.1 client
+LAUNCH_MILESTONES = (
+    ("jvm_start", "Запуск JVM", re.compile(r"ModLauncher running|ModLauncher \S+ starting")),
+    ("mod_discovery", "Поиск модов", re.compile(r"Launching target 'forgeclient'")),
+    ("mods_loaded", "Загрузка модов", re.compile(r"Injecting existing registry data into this CLIENT instance")),
+    ("title_screen", "Главное меню", re.compile(r"Sound engine started")),
+)
+LAUNCH_HISTORY_KEEP = 100
+
+
+def launch_history_file() -> str:
+    return os.path.join(CONFIG_DIR, "launch_history.json")
+
+
+def load_launch_history() -> list[dict]:
+    """Return recorded launches, oldest first."""
+    try:
+        with open(launch_history_file(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+class LaunchTimeline:
+    """Follow a game launch from JVM start to the title screen.
+
+    Lines from the game's stdout are passed to feed(); watch_log() tails
+    logs/latest.log as well, because mods can redirect what reaches stdout.
+    The first time any LAUNCH_MILESTONES pattern matches, the seconds since
+    spawn are stored and on_milestone(key, label, seconds) is called. The
+    timeline is saved to the launch history when the title screen is
+    reached and again, with the exit code, when the game exits.
+    """
+
+    def __init__(self, game_dir: str, details: dict, on_milestone=None):
+        self.game_dir = game_dir
+        self.on_milestone = on_milestone
+        self.record = {"started": round(time.time(), 3), **details, "milestones": {}}
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._remaining = list(LAUNCH_MILESTONES)
+        self._stop = threading.Event()
+        self._log_path = os.path.join(game_dir, "logs", "latest.log")
+        try:
+            st = os.stat(self._log_path)
+            # The previous session's log, which the game will replace
+            self._old_log = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            self._old_log = None
+
+    def feed(self, line: str):
+        if not self._remaining:
+            return
+        for key, label, pattern in list(self._remaining):
+            if pattern.search(line):
+                self._reach(key, label)
+
+    def _reach(self, key: str, label: str):
+        with self._lock:
+            if key in self.record["milestones"]:
+                return
+            seconds = round(time.monotonic() - self._started, 2)
+            self.record["milestones"][key] = seconds
+            self._remaining = [m for m in self._remaining if m[0] != key]
+        if self.on_milestone:
+            self.on_milestone(key, label, seconds)
+        if key == "title_screen":
+            self.save()
+
+    def watch_log(self):
+        """Tail logs/latest.log on a daemon thread until stop() or all milestones are seen."""
+        threading.Thread(target=self._tail, daemon=True).start()
+
+    def _tail(self):
+        offset = None
+        pending = ""
+        while not self._stop.wait(0.5) and self._remaining:
+            try:
+                st = os.stat(self._log_path)
+            except OSError:
+                continue
+            if offset is None:
+                if self._old_log == (st.st_ino, st.st_size, st.st_mtime_ns):
+                    continue  # not rotated yet
+                offset = 0
+            if st.st_size < offset:
+                offset = 0
+            if st.st_size == offset:
+                continue
+            try:
+                with open(self._log_path, "r", encoding="utf-8", errors="replace") as f:
+                    f.seek(offset)
+                    data = f.read()
+                    offset = f.tell()
+            except OSError:
+                continue
+            lines = (pending + data).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                self.feed(line)
+
+    def stop(self):
+        self._stop.set()
+
+    def finish(self, exit_code: int | None):
+        """Record how the game ended and save the timeline."""
+        self.stop()
+        self.record["exit_code"] = exit_code
+        self.record["session_s"] = round(time.monotonic() - self._started, 1)
+        self.save()
+
+    def save(self):
+        with self._lock:
+            history = [r for r in load_launch_history() if r.get("started") != self.record["started"]]
+            history.append(self.record)
+            try:
+                os.makedirs(CONFIG_DIR, exist_ok=True)
+                _save_json_file(launch_history_file(), history[-LAUNCH_HISTORY_KEEP:])
+            except OSError as e:
+                print(f"Could not save launch history: {e}")
+
+
+# Prefetch of game files into the OS page cache while the launcher is idle
+WARMUP = True
+WARMUP_MIN_FREE_MB = 1024
+_warmup_stop = threading.Event()
+warmup_status = {"state": "idle", "files": 0, "bytes": 0}
+
+
+def _warmup_files(game_dir: str) -> list[str]:
+    """Return the files the game reads at startup, in roughly that order."""
+    files = [_local_path(p) for p in _classpath_entries(JAVA_ARGS_TEMPLATE.format(GAME_DIR=game_dir))]
+    for sub, suffix in ((os.path.join("versions", "Forge-1.20.1", "natives"), ""), ("mods", ".jar")):
+        folder = os.path.join(game_dir, sub)
+        try:
+            files += sorted(os.path.join(folder, n) for n in os.listdir(folder) if n.endswith(suffix))
+        except OSError:
+            pass
+    return [f for f in dict.fromkeys(files) if os.path.isfile(f)]
+
+
+def _lower_thread_priority():
+    """Run the calling thread at background CPU and I/O priority where possible."""
+    try:
+        if os.name == "nt":
+            THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        elif hasattr(os, "setpriority"):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (OSError, AttributeError):
+        pass
+
+
+def warm_page_cache(game_dir: str, stop: threading.Event | None = None) -> dict:
+    """Pull the game's jars and natives into the OS page cache.
+
+    On Linux the kernel is asked to read ahead with posix_fadvise(WILLNEED);
+    elsewhere the files are read and discarded. Work stops when stop is set
+    (the game is starting) or free memory drops below WARMUP_MIN_FREE_MB,
+    since evicting other programs' pages would defeat the purpose. Progress
+    is kept in warmup_status; the result is also written to the metrics file.
+    """
+    stop = stop or _warmup_stop
+    _lower_thread_priority()
+    warmup_status.update(state="running", files=0, bytes=0)
+    reason = "done"
+    started_at = time.time()
+    started = time.perf_counter()
+    for path in _warmup_files(game_dir):
+        if stop.is_set():
+            reason = "game started"
+            break
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        _, available = system_memory()
+        if available and available - size / 2**20 < WARMUP_MIN_FREE_MB:
+            reason = "low memory"
+            break
+        try:
+            with open(path, "rb", buffering=0) as f:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                else:
+                    while not stop.is_set() and f.read(1024 * 1024):
+                        pass
+        except OSError:
+            continue
+        warmup_status["files"] += 1
+        warmup_status["bytes"] += size
+    warmup_status["state"] = reason
+    # Written on its own: warmup overlaps with updates and must not join their run
+    ms = round((time.perf_counter() - started) * 1000, 1)
+    _write_metrics([{
+        "type": "run", "kind": "warmup", "run": os.urandom(6).hex(), "start": round(started_at, 3),
+        "ms": ms, "ok": True, "message": reason, "stages": {"warmup": ms}, "files": warmup_status["files"],
+        "bytes": warmup_status["bytes"], "retries": 0, "errors": [],
+    }])
+    return dict(warmup_status)
+
+
+def start_warmup(game_dir: str):
+    """Start warm_page_cache on a background thread if enabled."""
+    if not WARMUP or warmup_status["state"] == "running":
+        return
+    _warmup_stop.clear()
+    threading.Thread(target=warm_page_cache, args=(game_dir,), name="warmup", daemon=True).start()
+
+
+game_process = None
+
+
+def game_running() -> bool:
+    return game_process is not None and game_process.poll() is None
+
+
+class LaunchError(Exception):
+    """The game cannot be started; the message is meant for the player."""
+
+
+def start_game(on_console=None, on_milestone=None, on_exit=None) -> subprocess.Popen:
+    """Launch the game using DEFAULT_CMD_TEMPLATE and EXTRA_ARGS.
+
+    The game output always goes to GAME_DIR/launcher_logs through a
+    ConsoleStream; on_console(stream, log_dir) receives it before the game
+    starts so a viewer can follow along. on_milestone(key, label, seconds)
+    is called for each of LAUNCH_MILESTONES and on_exit(exit_code) when the
+    game has exited, both on the output reader thread. Return the game
+    process or raise LaunchError.
+    """
+    with MetricsRun("launch"):
+        return _start_game(on_console, on_milestone, on_exit)
+
+
+def _start_game(on_console, on_milestone, on_exit) -> subprocess.Popen:
+    global game_process
+    # The JVM's own reads now compete with the prefetch
+    _warmup_stop.set()
+    if AUTO_UPDATE:
+        # Swap in an update staged in the background; skipped while it still downloads
+        with stage("staged_update") as span:
+            try:
+                span.set(version=apply_staged_update(blocking=False))
+            except OSError as e:
+                # The installed version is started instead
+                span.fail(str(e))
+    jar_path = os.path.join(GAME_DIR, "versions", "Forge-1.20.1", "Forge-1.20.1.jar")
+    with stage("game_files") as span:
+        found = os.path.exists(jar_path)
+        if not found:
+            span.fail("client jar missing")
+    if not found:
+        raise LaunchError("Игра не найдена, сначала обновитесь")
+    with stage("java") as span:
+        runtime = check_java()
+        if not runtime:
+            span.fail("no suitable runtime")
+            raise LaunchError("Java 17+ не найдена")
+        java_path = runtime["path"]
+        profile = jvm_profile(GAME_DIR, runtime, RAM_MB)
+        span.set(java=runtime["version"], gc=profile["gc"], xms=profile["xms"], xmx=profile["xmx"])
+    jvm_args = jvm_gc_args(profile, runtime)
+    try:
+        with stage("args_file"):
+            args_file = get_args_file(GAME_DIR, jvm_args, LAST_VERSION)
+    except MissingLibrariesError as e:
+        names = "\n".join(os.path.basename(_local_path(p)) for p in e.missing[:10])
+        if len(e.missing) > 10:
+            names += f"\n... и ещё {len(e.missing) - 10}"
+        raise LaunchError(
+            f"Не найдены файлы игры ({len(e.missing)}):\n{names}\n\nНажмите «Проверить файлы», чтобы восстановить их."
+        ) from e
+    # Build command as argument list so we control quoting and can terminate the
+    # actual java process later
+    with stage("cds") as span:
+        try:
+            cds_flags, cds_mode = cds_args(GAME_DIR, runtime, jvm_args)
+        except OSError as e:
+            span.fail(str(e))
+            cds_flags, cds_mode = [], "off"
+        span.set(mode=cds_mode)
+    base = [java_path, *jvm_heap_args(profile), *cds_flags, f"@{args_file}"]
+    extra_list = shlex.split(EXTRA_ARGS) if EXTRA_ARGS else []
+    cmd_list = base + extra_list + ["--username", USERNAME]
+    # Output is always captured so it ends up in GAME_DIR/launcher_logs; the
+    # console window only shows it
+    log_dir = os.path.join(GAME_DIR, "launcher_logs")
+    try:
+        log = RotatingLog(log_dir, LOG_MAX_SIZE, LOG_KEEP)
+    except OSError as e:
+        print(f"Could not open game log: {e}")
+        log = None
+    stream = ConsoleStream(log, max_pending=CONSOLE_MAX_LINES)
+    if on_console:
+        on_console(stream, log_dir)
+    timeline = LaunchTimeline(GAME_DIR, {
+        "version": LAST_VERSION,
+        "mods": count_mods(GAME_DIR),
+        "java": runtime["version"],
+        "gc": profile["gc"],
+        "xmx": profile["xmx"],
+        "cds": cds_mode,
+    }, on_milestone)
+    with stage("spawn"):
+        proc = subprocess.Popen(
+            cmd_list, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            encoding="utf-8", errors="replace", creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    game_process = proc
+    timeline.watch_log()
+
+    def reader():
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            line = line.rstrip()
+            stream.feed(line)
+            timeline.feed(line)
+        exit_code = proc.wait()
+        timeline.finish(exit_code)
+        if cds_mode == "dump" and exit_code != 0:
+            # The archive is written at exit; do not trust one from a crashed run
+            for flag in cds_flags:
+                try:
+                    os.remove(flag.split("=", 1)[1])
+                except OSError:
+                    pass
+        stream.close()
+        if on_exit:
+            on_exit(exit_code)
+
+    threading.Thread(target=reader, daemon=True).start()
+    return proc
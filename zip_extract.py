@@ -0,0 +1,98 @@
+"""Parallel zip extraction shared by both launchers."""
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+class UnsafePathError(ValueError):
+    """Raised for archive members that would be written outside the target."""
+
+
+def default_workers() -> int:
+    """Return the number of extraction workers to use by default."""
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def safe_member_path(dest_dir: str, name: str) -> str:
+    """Return the extraction path for name, refusing paths outside dest_dir."""
+    name = name.replace("\\", "/")
+    root = os.path.abspath(dest_dir)
+    target = os.path.abspath(os.path.join(root, *[p for p in name.split("/") if p]))
+    if name.startswith("/") or re.match(r"^[A-Za-z]:", name) or os.path.commonpath([root, target]) != root:
+        raise UnsafePathError(f"unsafe path in archive: {name}")
+    return target
+
+
+def _split_members(members, workers: int):
+    """Distribute members over workers so each gets a similar amount of data."""
+    buckets = [[] for _ in range(workers)]
+    sizes = [0] * workers
+    for member in sorted(members, key=lambda m: m.compress_size, reverse=True):
+        i = sizes.index(min(sizes))
+        buckets[i].append(member)
+        sizes[i] += member.compress_size
+    return [b for b in buckets if b]
+
+
+def extract_zip(zip_path: str, dest_dir: str, progress_callback=None, workers: int | None = None,
+                progress=None) -> list[str]:
+    """Extract zip_path into dest_dir using several worker threads.
+
+    Every worker opens its own handle to the archive and inflates a share of
+    the members; zlib releases the GIL, so the work spreads over all cores.
+    Member paths are checked before anything is written. progress_callback
+    receives ``("Распаковка", percent)`` based on uncompressed bytes written,
+    at most ten times a second. Instead of progress_callback, bytes can go
+    to progress, an object with start(total) and advance(n). Return the
+    names of the extracted members.
+    """
+    workers = workers or default_workers()
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        members = zf.infolist()
+    targets = {m.filename: safe_member_path(dest_dir, m.filename) for m in members}
+
+    files = []
+    for member in members:
+        if member.is_dir():
+            os.makedirs(targets[member.filename], exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(targets[member.filename]), exist_ok=True)
+            files.append(member)
+
+    total = sum(m.file_size for m in files) or 1
+    lock = threading.Lock()
+    state = {"written": 0, "reported": 0.0}
+    if progress:
+        progress.start(total)
+
+    def advance(n: int):
+        if progress:
+            progress.advance(n)
+            return
+        with lock:
+            state["written"] += n
+            now = time.monotonic()
+            if progress_callback and now - state["reported"] > 0.1:
+                state["reported"] = now
+                progress_callback("Распаковка", state["written"] * 100 / total)
+
+    def work(bucket):
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            for member in bucket:
+                with zf.open(member) as src, open(targets[member.filename], "wb") as dst:
+                    for block in iter(lambda: src.read(1024 * 1024), b""):
+                        dst.write(block)
+                        advance(len(block))
+
+    buckets = _split_members(files, workers)
+    if buckets:
+        with ThreadPoolExecutor(max_workers=len(buckets)) as pool:
+            for future in [pool.submit(work, bucket) for bucket in buckets]:
+                future.result()
+    if progress_callback:
+        progress_callback("Распаковка", 100)
+    return [m.filename for m in members]
+